@@ -3,13 +3,14 @@ from flask_migrate import Migrate
 from models import db, TimeEntry, WorkConfig, User, SystemSettings, Team, Role, Project, Company, CompanyWorkConfig, CompanySettings, UserPreferences, WorkRegion, AccountType, ProjectCategory, Task, SubTask, TaskStatus, TaskPriority, TaskDependency, Sprint, SprintStatus, Announcement, SystemEvent, WidgetType, UserDashboard, DashboardWidget, WidgetTemplate, Comment, CommentVisibility, BrandingSettings, CompanyInvitation, Note, NoteFolder, NoteShare
 from data_formatting import (
     format_duration, prepare_export_data, prepare_team_hours_export_data,
-    format_table_data, format_graph_data, format_team_data, format_burndown_data
+    format_table_data, format_burndown_counts, BURNDOWN_UNITS
 )
 # Data export functions moved to routes/export.py and routes/export_api.py
-from time_utils import apply_time_rounding, round_duration_to_interval, get_user_rounding_settings
+from time_utils import apply_time_rounding, round_duration_to_interval, get_user_rounding_settings, date_range_filter
 import logging
 from datetime import datetime, time, timedelta
 import os
+import tempfile
 import csv
 import io
 import pandas as pd
@@ -25,7 +26,7 @@ from routes.notes import notes_bp
 from routes.notes_download import notes_download_bp
 from routes.notes_api import notes_api_bp
 from routes.notes_public import notes_public_bp
-from routes.tasks import tasks_bp, get_filtered_tasks_for_burndown
+from routes.tasks import tasks_bp, get_burndown_task_counts
 from routes.tasks_api import tasks_api_bp
 from routes.sprints import sprints_bp
 from routes.sprints_api import sprints_api_bp
@@ -49,10 +50,17 @@ from routes.auth import login_required, admin_required, system_admin_required, r
 # Import utility functions
 from utils.auth import is_system_admin, can_access_system_settings
 from security_headers import init_security
-from utils.settings import get_system_setting
+from utils.settings import get_system_setting, get_branding
+from utils.identity import load_identity
+from utils.time_stats import get_user_time_stats
+from utils.time_windows import get_time_windows
+from utils.widget_data import WidgetDataContext, build_widget_data
+from utils.access_policy import accessible_projects_query, sprint_access_filter
 
 # Import analytics data function from export module
-from routes.export_api import get_filtered_analytics_data
+from routes.export_api import get_filtered_analytics_query, get_filtered_rollup_query, get_analytics_table_page, ANALYTICS_TABLE_SORTS
+from utils.analytics_engine import load_hours_frame, graph_data, team_data
+from utils.pagination import parse_page_size
 
 # Load environment variables from .env file
 load_dotenv()
@@ -66,6 +74,13 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:/
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev_key_for_timetrack')
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)  # Session lasts for 7 days
+app.config['IDENTITY_CACHE_TTL'] = int(os.environ.get('IDENTITY_CACHE_TTL', 15))  # Seconds, 0 disables the cache
+
+# Background exports, EXPORT_DIR must be shared by all workers
+app.config['EXPORT_DIR'] = os.environ.get('EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'timetrack-exports'))
+app.config['EXPORT_JOB_WORKERS'] = int(os.environ.get('EXPORT_JOB_WORKERS', 2))  # Threads per worker process
+app.config['EXPORT_JOB_TTL_HOURS'] = int(os.environ.get('EXPORT_JOB_TTL_HOURS', 24))  # How long files can be downloaded
+app.config['EXPORT_JOB_TIMEOUT_MINUTES'] = int(os.environ.get('EXPORT_JOB_TIMEOUT_MINUTES', 60))
 
 # Fix for HTTPS behind proxy (nginx, load balancer, etc)
 # This ensures forms use https:// URLs when behind a reverse proxy
@@ -162,6 +177,14 @@ app.register_blueprint(organization_bp)
 from routes.invitations import invitations_bp
 app.register_blueprint(invitations_bp)
 
+# Register CLI commands
+from utils.index_report import index_report_command
+from utils.export_jobs import cleanup_exports_command
+from utils.time_rollup import rebuild_time_rollups_command
+app.cli.add_command(index_report_command)
+app.cli.add_command(cleanup_exports_command)
+app.cli.add_command(rebuild_time_rollups_command)
+
 # Migration functions removed - migrations are now handled by startup.sh
 
 def init_system_settings():
@@ -213,13 +236,8 @@ def inject_globals():
     tracking_script_code = ''
 
     try:
-        tracking_enabled_setting = SystemSettings.query.filter_by(key='tracking_script_enabled').first()
-        if tracking_enabled_setting:
-            tracking_script_enabled = tracking_enabled_setting.value == 'true'
-
-        tracking_code_setting = SystemSettings.query.filter_by(key='tracking_script_code').first()
-        if tracking_code_setting:
-            tracking_script_code = tracking_code_setting.value
+        tracking_script_enabled = get_system_setting('tracking_script_enabled', 'false') == 'true'
+        tracking_script_code = get_system_setting('tracking_script_code', '')
     except Exception as e:
         # Rollback on any database error
         db.session.rollback()
@@ -309,14 +327,12 @@ def load_logged_in_user():
         g.user = None
         g.company = None
     else:
-        g.user = User.query.get(user_id)
+        # User, company and preferences come from one joined query (or the
+        # short-lived identity cache) instead of separate lookups
+        g.user, g.company = load_identity(
+            user_id, ttl=app.config['IDENTITY_CACHE_TTL']
+        )
         if g.user:
-            # Set company context
-            if g.user.company_id:
-                g.company = Company.query.get(g.user.company_id)
-            else:
-                g.company = None
-
             # Check if user has email but not verified
             if g.user and not g.user.is_verified and g.user.email:
                 # Add a flag for templates to show email verification nag
@@ -332,8 +348,8 @@ def load_logged_in_user():
         else:
             g.company = None
 
-    # Load branding settings
-    g.branding = BrandingSettings.get_current()
+    # Load branding settings (served from the settings cache)
+    g.branding = get_branding()
 
 @app.route('/setup', methods=['GET', 'POST'])
 def setup():
@@ -455,56 +471,16 @@ def home():
         # Get available projects
         available_projects = []
         if g.user.company_id:
-            if g.user.role == Role.ADMIN:
-                # Admin can see all company projects
-                available_projects = Project.query.filter_by(
-                    company_id=g.user.company_id,
-                    is_active=True
-                ).order_by(Project.code).all()
-            else:
-                # Regular users see only their assigned projects
-                all_projects = Project.query.filter_by(
-                    company_id=g.user.company_id,
-                    is_active=True
-                ).all()
-                for project in all_projects:
-                    if project.is_user_allowed(g.user):
-                        available_projects.append(project)
+            available_projects = accessible_projects_query(g.user).order_by(Project.code).all()
 
         # Calculate statistics (if we want the stats section to show)
-        from datetime import date, timedelta
-        today = date.today()
-        week_start = today - timedelta(days=today.weekday())
-        month_start = today.replace(day=1)
-
-        # Today's hours
-        today_entries = TimeEntry.query.filter(
-            TimeEntry.user_id == g.user.id,
-            func.date(TimeEntry.arrival_time) == today
-        ).all()
-        today_hours = sum(entry.duration or 0 for entry in today_entries)
-
-        # This week's hours
-        week_entries = TimeEntry.query.filter(
-            TimeEntry.user_id == g.user.id,
-            func.date(TimeEntry.arrival_time) >= week_start
-        ).all()
-        week_hours = sum(entry.duration or 0 for entry in week_entries)
-
-        # This month's hours
-        month_entries = TimeEntry.query.filter(
-            TimeEntry.user_id == g.user.id,
-            func.date(TimeEntry.arrival_time) >= month_start
-        ).all()
-        month_hours = sum(entry.duration or 0 for entry in month_entries)
+        stats = get_user_time_stats(g.user.id, windows=get_time_windows(g.user))
+        today_hours = stats['today_hours']
+        week_hours = stats['week_hours']
+        month_hours = stats['month_hours']
 
         # Active projects (projects with recent entries)
-        active_project_ids = db.session.query(TimeEntry.project_id).filter(
-            TimeEntry.user_id == g.user.id,
-            TimeEntry.project_id.isnot(None),
-            TimeEntry.arrival_time >= datetime.now() - timedelta(days=30)
-        ).distinct().all()
-        active_projects = [p for p in available_projects if p.id in [pid[0] for pid in active_project_ids]]
+        active_projects = [p for p in available_projects if p.id in stats['active_project_ids']]
 
         return render_template('index.html', title='Home',
                              active_entry=active_entry,
@@ -1399,7 +1375,7 @@ def about():
 @app.route('/imprint')
 def imprint():
     """Display the imprint/legal page if enabled"""
-    branding = BrandingSettings.get_current()
+    branding = get_branding()
 
     # Check if imprint is enabled
     if not branding or not branding.imprint_enabled:
@@ -1635,57 +1611,16 @@ def time_tracking():
     ).limit(50).all()
 
     # Get available projects
-    available_projects = []
-    if g.user.role == Role.ADMIN:
-        # Admin can see all company projects
-        available_projects = Project.query.filter_by(
-            company_id=g.user.company_id,
-            is_active=True
-        ).order_by(Project.code).all()
-    else:
-        # Regular users see only their assigned projects
-        all_projects = Project.query.filter_by(
-            company_id=g.user.company_id,
-            is_active=True
-        ).all()
-        for project in all_projects:
-            if project.is_user_allowed(g.user):
-                available_projects.append(project)
+    available_projects = accessible_projects_query(g.user).order_by(Project.code).all()
 
     # Calculate statistics
-    from datetime import date, timedelta
-    today = date.today()
-    week_start = today - timedelta(days=today.weekday())
-    month_start = today.replace(day=1)
-
-    # Today's hours
-    today_entries = TimeEntry.query.filter(
-        TimeEntry.user_id == g.user.id,
-        func.date(TimeEntry.arrival_time) == today
-    ).all()
-    today_hours = sum(entry.duration or 0 for entry in today_entries)
-
-    # This week's hours
-    week_entries = TimeEntry.query.filter(
-        TimeEntry.user_id == g.user.id,
-        func.date(TimeEntry.arrival_time) >= week_start
-    ).all()
-    week_hours = sum(entry.duration or 0 for entry in week_entries)
-
-    # This month's hours
-    month_entries = TimeEntry.query.filter(
-        TimeEntry.user_id == g.user.id,
-        func.date(TimeEntry.arrival_time) >= month_start
-    ).all()
-    month_hours = sum(entry.duration or 0 for entry in month_entries)
+    stats = get_user_time_stats(g.user.id, windows=get_time_windows(g.user))
+    today_hours = stats['today_hours']
+    week_hours = stats['week_hours']
+    month_hours = stats['month_hours']
 
     # Active projects (projects with recent entries)
-    active_project_ids = db.session.query(TimeEntry.project_id).filter(
-        TimeEntry.user_id == g.user.id,
-        TimeEntry.project_id.isnot(None),
-        TimeEntry.arrival_time >= datetime.now() - timedelta(days=30)
-    ).distinct().all()
-    active_projects = [p for p in available_projects if p.id in [pid[0] for pid in active_project_ids]]
+    active_projects = [p for p in available_projects if p.id in stats['active_project_ids']]
 
     return render_template('time_tracking.html',
                          title='Time Tracking',
@@ -2112,7 +2047,7 @@ def system_admin_health():
     # Recent activity stats
     today = now.date()
     today_events = SystemEvent.query.filter(
-        func.date(SystemEvent.timestamp) == today
+        *date_range_filter(SystemEvent.timestamp, today, today)
     ).count()
 
     # Log the health check
@@ -2161,11 +2096,7 @@ def analytics(mode='personal'):
             return redirect(url_for('analytics', mode='personal'))
 
     # Get available projects for filtering
-    available_projects = []
-    all_projects = Project.query.filter_by(is_active=True).all()
-    for project in all_projects:
-        if project.is_user_allowed(g.user):
-            available_projects.append(project)
+    available_projects = accessible_projects_query(g.user).order_by(Project.code).all()
 
     # Get team members if in team mode
     team_members = []
@@ -2214,23 +2145,49 @@ def analytics_data():
         if end_date:
             end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
 
-        # Get filtered data
-        data = get_filtered_analytics_data(g.user, mode, start_date, end_date, project_filter)
+        # Format data based on view type, graph and team views are summed in SQL
+        if view_type in ['graph', 'team']:
+            hours = load_hours_frame(
+                get_filtered_analytics_query(g.user, mode, start_date, end_date, project_filter, projection=True),
+                get_filtered_rollup_query(g.user, mode, start_date, end_date, project_filter),
+                get_time_windows(g.user)
+            )
 
-        # Format data based on view type
         if view_type == 'graph':
-            formatted_data = format_graph_data(data, granularity)
+            formatted_data = graph_data(hours, granularity)
             # For burndown chart, we need task data instead of time entries
             chart_type = request.args.get('chart_type', 'timeSeries')
             if chart_type == 'burndown':
-                # Get tasks for burndown chart
-                tasks = get_filtered_tasks_for_burndown(g.user, mode, start_date, end_date, project_filter)
-                burndown_data = format_burndown_data(tasks, start_date, end_date)
+                # Tasks are counted per completion date in SQL
+                unit = request.args.get('burndown_unit', 'tasks')
+                if unit not in BURNDOWN_UNITS:
+                    return jsonify({'error': 'Invalid burndown unit'}), 400
+                task_counts = get_burndown_task_counts(g.user, mode, start_date, end_date, project_filter)
+                burndown_data = format_burndown_counts(task_counts, start_date, end_date, unit)
                 formatted_data.update(burndown_data)
         elif view_type == 'team':
-            formatted_data = format_team_data(data, granularity)
+            formatted_data = team_data(hours, granularity)
         else:
-            formatted_data = format_table_data(data)
+            sort = request.args.get('sort', 'newest')
+            if sort not in ANALYTICS_TABLE_SORTS:
+                return jsonify({'error': 'Invalid sort'}), 400
+            try:
+                rows, next_cursor, total_count = get_analytics_table_page(
+                    g.user, mode, start_date, end_date, project_filter,
+                    cursor=request.args.get('cursor'),
+                    limit=parse_page_size(request.args.get('limit')),
+                    sort=sort
+                )
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            formatted_data = format_table_data(rows)
+            formatted_data.update({
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None,
+                'sort': sort
+            })
+            if total_count is not None:
+                formatted_data['total_count'] = total_count
 
         return jsonify(formatted_data)
 
@@ -2583,271 +2540,57 @@ def update_widget_positions():
 def get_widget_data(widget_id):
     """Get data for a specific widget."""
     try:
-        # Get user dashboard
-        dashboard = UserDashboard.query.filter_by(user_id=g.user.id).first()
-        if not dashboard:
-            return jsonify({'success': False, 'error': 'Dashboard not found'})
-
-        # Find widget
-        widget = DashboardWidget.query.filter_by(
-            id=widget_id,
-            dashboard_id=dashboard.id
+        # Find widget on the user's dashboard
+        widget = DashboardWidget.query.join(UserDashboard).filter(
+            DashboardWidget.id == widget_id,
+            UserDashboard.user_id == g.user.id
         ).first()
 
         if not widget:
             return jsonify({'success': False, 'error': 'Widget not found'})
 
-        # Get widget-specific data based on type
-        widget_data = {}
-
-        if widget.widget_type == WidgetType.DAILY_SUMMARY:
-            from datetime import datetime, timedelta
-
-            config = widget.config or {}
-            period = config.get('summary_period', 'daily')
-
-            # Calculate time summaries
-            now = datetime.now()
-
-            # Today's summary
-            start_of_today = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            today_entries = TimeEntry.query.filter(
-                TimeEntry.user_id == g.user.id,
-                TimeEntry.arrival_time >= start_of_today,
-                TimeEntry.departure_time.isnot(None)
-            ).all()
-            today_seconds = sum(entry.duration or 0 for entry in today_entries)
-
-            # This week's summary
-            start_of_week = start_of_today - timedelta(days=start_of_today.weekday())
-            week_entries = TimeEntry.query.filter(
-                TimeEntry.user_id == g.user.id,
-                TimeEntry.arrival_time >= start_of_week,
-                TimeEntry.departure_time.isnot(None)
-            ).all()
-            week_seconds = sum(entry.duration or 0 for entry in week_entries)
-
-            # This month's summary
-            start_of_month = start_of_today.replace(day=1)
-            month_entries = TimeEntry.query.filter(
-                TimeEntry.user_id == g.user.id,
-                TimeEntry.arrival_time >= start_of_month,
-                TimeEntry.departure_time.isnot(None)
-            ).all()
-            month_seconds = sum(entry.duration or 0 for entry in month_entries)
-
-            widget_data.update({
-                'today': f"{today_seconds // 3600}h {(today_seconds % 3600) // 60}m",
-                'week': f"{week_seconds // 3600}h {(week_seconds % 3600) // 60}m",
-                'month': f"{month_seconds // 3600}h {(month_seconds % 3600) // 60}m",
-                'entries_today': len(today_entries),
-                'entries_week': len(week_entries),
-                'entries_month': len(month_entries)
-            })
-
-        elif widget.widget_type == WidgetType.ACTIVE_PROJECTS:
-            config = widget.config or {}
-            project_filter = config.get('project_filter', 'all')
-            max_projects = int(config.get('max_projects', 5))
-
-            # Get user's projects
-            if g.user.role in [Role.ADMIN, Role.SUPERVISOR]:
-                projects = Project.query.filter_by(
-                    company_id=g.user.company_id,
-                    is_active=True
-                ).limit(max_projects).all()
-            elif g.user.team_id:
-                projects = Project.query.filter(
-                    Project.company_id == g.user.company_id,
-                    Project.is_active == True,
-                    db.or_(Project.team_id == g.user.team_id, Project.team_id == None)
-                ).limit(max_projects).all()
-            else:
-                projects = []
-
-            widget_data['projects'] = [{
-                'id': p.id,
-                'name': p.name,
-                'code': p.code,
-                'description': p.description
-            } for p in projects]
-
-        elif widget.widget_type == WidgetType.ASSIGNED_TASKS:
-            config = widget.config or {}
-            task_filter = config.get('task_filter', 'assigned')
-            task_status = config.get('task_status', 'active')
-
-            # Get user's tasks based on filter
-            if task_filter == 'assigned':
-                tasks = Task.query.filter_by(assigned_to_id=g.user.id)
-            elif task_filter == 'created':
-                # Filter by created tasks - using assigned_to as fallback since created_by_id was removed
-                tasks = Task.query.filter_by(assigned_to_id=g.user.id)
-            else:
-                # Get tasks from user's projects
-                if g.user.team_id:
-                    project_ids = [p.id for p in Project.query.filter(
-                        Project.company_id == g.user.company_id,
-                        db.or_(Project.team_id == g.user.team_id, Project.team_id == None)
-                    ).all()]
-                    tasks = Task.query.filter(Task.project_id.in_(project_ids))
-                else:
-                    tasks = Task.query.join(Project).filter(Project.company_id == g.user.company_id)
-
-            # Filter by status if specified
-            if task_status != 'all':
-                if task_status == 'active':
-                    tasks = tasks.filter(Task.status.in_([TaskStatus.PENDING, TaskStatus.IN_PROGRESS]))
-                elif task_status == 'pending':
-                    tasks = tasks.filter_by(status=TaskStatus.PENDING)
-                elif task_status == 'completed':
-                    tasks = tasks.filter_by(status=TaskStatus.COMPLETED)
-
-            tasks = tasks.limit(10).all()
-
-            widget_data['tasks'] = [{
-                'id': t.id,
-                'name': t.name,
-                'description': t.description,
-                'status': t.status.value if t.status else 'Pending',
-                'priority': t.priority.value if t.priority else 'Medium',
-                'project_name': t.project.name if t.project else 'No Project'
-            } for t in tasks]
-
-        elif widget.widget_type == WidgetType.WEEKLY_CHART:
-            from datetime import datetime, timedelta
-
-            # Get weekly data for chart
-            now = datetime.now()
-            start_of_week = now - timedelta(days=now.weekday())
-
-            weekly_data = []
-            for i in range(7):
-                day = start_of_week + timedelta(days=i)
-                day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-                day_end = day_start + timedelta(days=1)
-
-                day_entries = TimeEntry.query.filter(
-                    TimeEntry.user_id == g.user.id,
-                    TimeEntry.arrival_time >= day_start,
-                    TimeEntry.arrival_time < day_end,
-                    TimeEntry.departure_time.isnot(None)
-                ).all()
-
-                total_seconds = sum(entry.duration or 0 for entry in day_entries)
-                weekly_data.append({
-                    'day': day.strftime('%A'),
-                    'date': day.strftime('%Y-%m-%d'),
-                    'hours': round(total_seconds / 3600, 2),
-                    'entries': len(day_entries)
-                })
-
-            widget_data['weekly_data'] = weekly_data
-
-        elif widget.widget_type == WidgetType.TASK_PRIORITY:
-            # Get tasks by priority
-            if g.user.team_id:
-                project_ids = [p.id for p in Project.query.filter(
-                    Project.company_id == g.user.company_id,
-                    db.or_(Project.team_id == g.user.team_id, Project.team_id == None)
-                ).all()]
-                tasks = Task.query.filter(
-                    Task.project_id.in_(project_ids),
-                    Task.assigned_to_id == g.user.id
-                ).order_by(Task.priority.desc(), Task.created_at.desc()).limit(10).all()
-            else:
-                tasks = Task.query.filter_by(assigned_to_id=g.user.id).order_by(
-                    Task.priority.desc(), Task.created_at.desc()
-                ).limit(10).all()
-
-            widget_data['priority_tasks'] = [{
-                'id': t.id,
-                'name': t.name,
-                'description': t.description,
-                'priority': t.priority.value if t.priority else 'Medium',
-                'status': t.status.value if t.status else 'Pending',
-                'project_name': t.project.name if t.project else 'No Project'
-            } for t in tasks]
-
-        elif widget.widget_type == WidgetType.PROJECT_PROGRESS:
-            # Get project progress data
-            if g.user.role in [Role.ADMIN, Role.SUPERVISOR]:
-                projects = Project.query.filter_by(
-                    company_id=g.user.company_id,
-                    is_active=True
-                ).limit(5).all()
-            elif g.user.team_id:
-                projects = Project.query.filter(
-                    Project.company_id == g.user.company_id,
-                    Project.is_active == True,
-                    db.or_(Project.team_id == g.user.team_id, Project.team_id == None)
-                ).limit(5).all()
-            else:
-                projects = []
-
-            project_progress = []
-            for project in projects:
-                total_tasks = Task.query.filter_by(project_id=project.id).count()
-                completed_tasks = Task.query.filter_by(
-                    project_id=project.id,
-                    status=TaskStatus.COMPLETED
-                ).count()
-
-                progress = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+        return jsonify({
+            'success': True,
+            'data': build_widget_data(widget, WidgetDataContext(g.user))
+        })
 
-                project_progress.append({
-                    'id': project.id,
-                    'name': project.name,
-                    'code': project.code,
-                    'progress': round(progress, 1),
-                    'completed_tasks': completed_tasks,
-                    'total_tasks': total_tasks
-                })
+    except Exception as e:
+        logger.error(f"Error getting widget data: {e}")
+        return jsonify({'success': False, 'error': str(e)})
 
-            widget_data['project_progress'] = project_progress
+@app.route('/api/dashboard/data')
+@role_required(Role.TEAM_MEMBER)
+@company_required
+def get_dashboard_data():
+    """Get data for all visible widgets of the user's dashboard in one request."""
+    try:
+        dashboard = UserDashboard.query.filter_by(user_id=g.user.id).first()
+        if not dashboard:
+            return jsonify({'success': False, 'error': 'Dashboard not found'})
 
-        elif widget.widget_type == WidgetType.PRODUCTIVITY_METRICS:
-            from datetime import datetime, timedelta
+        widgets = DashboardWidget.query.filter_by(
+            dashboard_id=dashboard.id,
+            is_visible=True
+        ).all()
 
-            # Calculate productivity metrics
-            now = datetime.now()
-            today = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            week_ago = today - timedelta(days=7)
-
-            # This week vs last week comparison
-            this_week_entries = TimeEntry.query.filter(
-                TimeEntry.user_id == g.user.id,
-                TimeEntry.arrival_time >= week_ago,
-                TimeEntry.departure_time.isnot(None)
-            ).all()
-
-            last_week_entries = TimeEntry.query.filter(
-                TimeEntry.user_id == g.user.id,
-                TimeEntry.arrival_time >= week_ago - timedelta(days=7),
-                TimeEntry.arrival_time < week_ago,
-                TimeEntry.departure_time.isnot(None)
-            ).all()
-
-            this_week_hours = sum(entry.duration or 0 for entry in this_week_entries) / 3600
-            last_week_hours = sum(entry.duration or 0 for entry in last_week_entries) / 3600
-
-            productivity_change = ((this_week_hours - last_week_hours) / last_week_hours * 100) if last_week_hours > 0 else 0
-
-            widget_data.update({
-                'this_week_hours': round(this_week_hours, 1),
-                'last_week_hours': round(last_week_hours, 1),
-                'productivity_change': round(productivity_change, 1),
-                'avg_daily_hours': round(this_week_hours / 7, 1),
-                'total_entries': len(this_week_entries)
-            })
+        # One context for all widgets so shared sub-results are computed once
+        context = WidgetDataContext(g.user)
+        results = {}
+        for widget in widgets:
+            try:
+                results[widget.id] = {'success': True, 'data': build_widget_data(widget, context)}
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error getting data for widget {widget.id}: {e}")
+                results[widget.id] = {'success': False, 'error': str(e)}
 
         return jsonify({
             'success': True,
-            'data': widget_data
+            'widgets': results
         })
 
     except Exception as e:
-        logger.error(f"Error getting widget data: {e}")
+        logger.error(f"Error getting dashboard data: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/current-timer-status')
@@ -2897,17 +2640,11 @@ def search_sprints():
         if not query:
             return jsonify({'success': True, 'sprints': []})
 
-        # Search sprints in the same company
-        sprints = Sprint.query.filter(
-            Sprint.company_id == g.user.company_id,
+        # Search sprints the user has access to, filtered before the limit
+        accessible_sprints = Sprint.query.filter(
+            sprint_access_filter(g.user),
             Sprint.name.ilike(f'%{query}%')
-        ).limit(10).all()
-
-        # Filter sprints user has access to
-        accessible_sprints = [
-            sprint for sprint in sprints
-            if sprint.can_user_access(g.user)
-        ]
+        ).order_by(Sprint.name).limit(10).all()
 
         sprint_list = [
             {
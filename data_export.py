@@ -5,242 +5,213 @@ Handles exporting time entries and analytics data to various file formats (CSV,
 
 import io
 import csv
-import pandas as pd
-from flask import Response, send_file
+import tempfile
+import xlsxwriter
+from flask import Response, send_file, stream_with_context
 from datetime import datetime
-from data_formatting import format_duration
+from data_formatting import (
+    format_duration, iter_export_rows, analytics_export_headers, iter_analytics_export_rows,
+    summarize_hours_by_user
+)
 
+# Rows fetched per database round trip when exporting with Query.yield_per()
+EXPORT_BATCH_SIZE = 1000
 
-def export_to_csv(data, filename):
-    """Export data to CSV format."""
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=data[0].keys())
-    writer.writeheader()
-    writer.writerows(data)
-    
+# Rows written before a CSV chunk is sent to the client
+CSV_CHUNK_ROWS = 500
+
+EXCEL_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Same look as the header row pandas used to write
+DEFAULT_EXCEL_HEADER_FORMAT = {'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}
+
+
+def iter_csv_chunks(header, rows):
+    """Yield a CSV file in chunks of CSV_CHUNK_ROWS rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % CSV_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def stream_csv(header, rows, filename):
+    """Stream rows as a CSV download without building the whole file in memory."""
     return Response(
-        output.getvalue(),
+        stream_with_context(iter_csv_chunks(header, rows)),
         mimetype='text/csv',
-        headers={'Content-Disposition': f'attachment;filename={filename}.csv'}
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
     )
 
 
-def export_to_excel(data, filename):
-    """Export data to Excel format with formatting."""
-    df = pd.DataFrame(data)
-    output = io.BytesIO()
-    
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, sheet_name='TimeTrack Data', index=False)
-        
-        # Auto-adjust columns' width
-        worksheet = writer.sheets['TimeTrack Data']
-        for i, col in enumerate(df.columns):
-            column_width = max(df[col].astype(str).map(len).max(), len(col)) + 2
-            worksheet.set_column(i, i, column_width)
-    
-    output.seek(0)
-    
+def write_csv(header, rows, path):
+    """Write rows to a CSV file chunk by chunk."""
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        for chunk in iter_csv_chunks(header, rows):
+            output.write(chunk)
+
+
+def _dict_rows(data):
+    """Split an iterable of dicts into its keys and a generator of value lists."""
+    rows = iter(data)
+    first_row = next(rows, None)
+    fieldnames = list(first_row.keys()) if first_row else []
+
+    def value_rows():
+        if first_row is None:
+            return
+        yield [first_row[name] for name in fieldnames]
+        for row in rows:
+            yield [row[name] for name in fieldnames]
+
+    return fieldnames, value_rows()
+
+
+def time_entry_export_table(entries):
+    """Header and rows of a time entry export."""
+    return _dict_rows(iter_export_rows(entries))
+
+
+def export_to_csv(data, filename):
+    """Export data to CSV format. Rows are streamed, so data may be a generator."""
+    fieldnames, rows = _dict_rows(data)
+    return stream_csv(fieldnames, rows, f'{filename}.csv')
+
+
+def write_excel(header, rows, sheet_name, header_format=None, max_column_width=None, output=None):
+    """
+    Write rows to an .xlsx file and return it.
+
+    output may be a path or a file object. By default a temporary file is
+    used, which is returned positioned at the start.
+
+    The workbook is written in xlsxwriter's constant_memory mode, which flushes
+    every row to disk once the next one starts, and column widths are tracked
+    while writing, so memory use does not grow with the number of rows.
+    """
+    is_temporary = output is None
+    if is_temporary:
+        output = tempfile.TemporaryFile(suffix='.xlsx')
+    workbook = xlsxwriter.Workbook(output, {
+        'constant_memory': True,
+        # Cell values are user input (notes, names), never formulas or links
+        'strings_to_formulas': False,
+        'strings_to_urls': False,
+    })
+    try:
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.write_row(0, 0, header, workbook.add_format(header_format or DEFAULT_EXCEL_HEADER_FORMAT))
+
+        widths = [len(str(name)) for name in header]
+        for row_num, row in enumerate(rows, 1):
+            worksheet.write_row(row_num, 0, row)
+            for i, value in enumerate(row):
+                widths[i] = max(widths[i], len(str(value)))
+
+        # Column settings are kept apart from the flushed rows, so they can come last
+        for i, width in enumerate(widths):
+            width += 2
+            if max_column_width:
+                width = min(width, max_column_width)
+            worksheet.set_column(i, i, width)
+
+        workbook.close()
+    except Exception:
+        if is_temporary:
+            output.close()
+        raise
+
+    if is_temporary:
+        output.seek(0)
+    return output
+
+
+def send_excel(output, filename):
+    """Send a file written by write_excel(); it is closed, and so deleted, once sent."""
     return send_file(
         output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        mimetype=EXCEL_MIMETYPE,
         as_attachment=True,
-        download_name=f"{filename}.xlsx"
+        download_name=filename
     )
 
 
+def export_to_excel(data, filename):
+    """Export data to Excel format with formatting. Rows are written as they are read."""
+    fieldnames, rows = _dict_rows(data)
+    return send_excel(write_excel(fieldnames, rows, 'TimeTrack Data'), f"{filename}.xlsx")
+
+
 def export_team_hours_to_csv(data, filename):
     """Export team hours data to CSV format."""
     if not data:
         return None
-        
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=data[0].keys())
-    writer.writeheader()
-    writer.writerows(data)
-    
-    return Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={'Content-Disposition': f'attachment;filename={filename}.csv'}
-    )
+
+    return export_to_csv(data, filename)
 
 
 def export_team_hours_to_excel(data, filename, team_name):
     """Export team hours data to Excel format with formatting."""
     if not data:
         return None
-        
-    df = pd.DataFrame(data)
-    output = io.BytesIO()
-    
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, sheet_name=f'{team_name} Hours', index=False)
-        
-        # Get the workbook and worksheet objects
-        workbook = writer.book
-        worksheet = writer.sheets[f'{team_name} Hours']
-        
-        # Create formats
-        header_format = workbook.add_format({
-            'bold': True,
-            'text_wrap': True,
-            'valign': 'top',
-            'fg_color': '#4CAF50',
-            'font_color': 'white',
-            'border': 1
-        })
-        
-        # Auto-adjust columns' width and apply formatting
-        for i, col in enumerate(df.columns):
-            column_width = max(df[col].astype(str).map(len).max(), len(col)) + 2
-            worksheet.set_column(i, i, column_width)
-            
-            # Apply header formatting
-            worksheet.write(0, i, col, header_format)
-    
-    output.seek(0)
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=f"{filename}.xlsx"
-    )
 
+    header_format = {
+        'bold': True,
+        'text_wrap': True,
+        'valign': 'top',
+        'fg_color': '#4CAF50',
+        'font_color': 'white',
+        'border': 1
+    }
+    fieldnames, rows = _dict_rows(data)
+    output = write_excel(fieldnames, rows, f'{team_name} Hours', header_format=header_format)
+    return send_excel(output, f"{filename}.xlsx")
 
-def export_analytics_csv(entries, view_type, mode):
-    """Export analytics data as CSV."""
-    output = io.StringIO()
-    
+
+ANALYTICS_EXCEL_HEADER_FORMAT = {
+    'bold': True,
+    'text_wrap': True,
+    'valign': 'top',
+    'fg_color': '#D7E4BD',
+    'border': 1
+}
+
+
+def analytics_export_table(entries, view_type, mode):
+    """Header and rows of an analytics export."""
     if view_type == 'team':
-        # Team summary CSV
-        writer = csv.writer(output)
-        writer.writerow(['Team Member', 'Total Hours', 'Total Entries'])
-        
-        # Group by user
-        user_data = {}
-        for entry in entries:
-            if entry.departure_time and entry.duration:
-                username = entry.user.username
-                if username not in user_data:
-                    user_data[username] = {'hours': 0, 'entries': 0}
-                user_data[username]['hours'] += entry.duration / 3600
-                user_data[username]['entries'] += 1
-        
-        for username, data in user_data.items():
-            writer.writerow([username, f"{data['hours']:.2f}", data['entries']])
-    else:
-        # Detailed entries CSV
-        writer = csv.writer(output)
-        headers = ['Date', 'Arrival Time', 'Departure Time', 'Duration', 'Break Duration', 'Project Code', 'Project Name', 'Notes']
-        if mode == 'team':
-            headers.insert(1, 'User')
-        writer.writerow(headers)
-        
-        for entry in entries:
-            row = [
-                entry.arrival_time.strftime('%Y-%m-%d'),
-                entry.arrival_time.strftime('%H:%M:%S'),
-                entry.departure_time.strftime('%H:%M:%S') if entry.departure_time else 'Active',
-                format_duration(entry.duration) if entry.duration else 'In progress',
-                format_duration(entry.total_break_duration),
-                entry.project.code if entry.project else '',
-                entry.project.name if entry.project else 'No Project',
-                entry.notes or ''
-            ]
-            if mode == 'team':
-                row.insert(1, entry.user.username)
-            writer.writerow(row)
-    
-    output.seek(0)
-    filename = f"analytics_{view_type}_{mode}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    
-    return Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={'Content-Disposition': f'attachment; filename={filename}'}
-    )
+        # Team summary
+        user_data = summarize_hours_by_user(entries)
+        rows = ([username, f"{data['hours']:.2f}", data['entries']]
+                for username, data in user_data.items())
+        return ['Team Member', 'Total Hours', 'Total Entries'], rows
+
+    # Detailed entries
+    return analytics_export_headers(mode), iter_analytics_export_rows(entries, mode)
+
+
+def analytics_export_filename(view_type, mode, extension):
+    return f"analytics_{view_type}_{mode}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+
+def export_analytics_csv(entries, view_type, mode):
+    """Export analytics data as CSV, streaming the rows as entries are read."""
+    header, rows = analytics_export_table(entries, view_type, mode)
+    return stream_csv(header, rows, analytics_export_filename(view_type, mode, 'csv'))
 
 
 def export_analytics_excel(entries, view_type, mode):
-    """Export analytics data as Excel."""
+    """Export analytics data as Excel, writing rows as entries are read."""
     try:
-        output = io.BytesIO()
-        
-        if view_type == 'team':
-            # Team summary Excel
-            user_data = {}
-            for entry in entries:
-                if entry.departure_time and entry.duration:
-                    username = entry.user.username
-                    if username not in user_data:
-                        user_data[username] = {'hours': 0, 'entries': 0}
-                    user_data[username]['hours'] += entry.duration / 3600
-                    user_data[username]['entries'] += 1
-            
-            df = pd.DataFrame([
-                {
-                    'Team Member': username,
-                    'Total Hours': f"{data['hours']:.2f}",
-                    'Total Entries': data['entries']
-                }
-                for username, data in user_data.items()
-            ])
-        else:
-            # Detailed entries Excel
-            data_list = []
-            for entry in entries:
-                row_data = {
-                    'Date': entry.arrival_time.strftime('%Y-%m-%d'),
-                    'Arrival Time': entry.arrival_time.strftime('%H:%M:%S'),
-                    'Departure Time': entry.departure_time.strftime('%H:%M:%S') if entry.departure_time else 'Active',
-                    'Duration': format_duration(entry.duration) if entry.duration else 'In progress',
-                    'Break Duration': format_duration(entry.total_break_duration),
-                    'Project Code': entry.project.code if entry.project else '',
-                    'Project Name': entry.project.name if entry.project else 'No Project',
-                    'Notes': entry.notes or ''
-                }
-                if mode == 'team':
-                    row_data['User'] = entry.user.username
-                data_list.append(row_data)
-            
-            df = pd.DataFrame(data_list)
-        
-        # Write to Excel with formatting
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df.to_excel(writer, sheet_name='Analytics Data', index=False)
-            
-            # Get workbook and worksheet
-            workbook = writer.book
-            worksheet = writer.sheets['Analytics Data']
-            
-            # Add formatting
-            header_format = workbook.add_format({
-                'bold': True,
-                'text_wrap': True,
-                'valign': 'top',
-                'fg_color': '#D7E4BD',
-                'border': 1
-            })
-            
-            # Write headers with formatting
-            for col_num, value in enumerate(df.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-            
-            # Auto-adjust column widths
-            for i, col in enumerate(df.columns):
-                max_len = max(df[col].astype(str).apply(len).max(), len(col)) + 2
-                worksheet.set_column(i, i, min(max_len, 50))
-        
-        output.seek(0)
-        filename = f"analytics_{view_type}_{mode}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        
-        return Response(
-            output.getvalue(),
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            headers={'Content-Disposition': f'attachment; filename={filename}'}
-        )
-        
+        header, rows = analytics_export_table(entries, view_type, mode)
+        output = write_excel(header, rows, 'Analytics Data',
+                             header_format=ANALYTICS_EXCEL_HEADER_FORMAT, max_column_width=50)
     except Exception as e:
-        raise Exception(f"Error creating Excel export: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Error creating Excel export: {str(e)}")
+
+    return send_excel(output, analytics_export_filename(view_type, mode, 'xlsx'))
@@ -1,10 +1,13 @@
 """
 Data formatting utilities for TimeTrack application.
 Handles conversion of time entries and analytics data to various display formats.
+
+Time entry formatters take the column rows of time_entry_rows_query() in
+routes/export_api.py (project_code, project_name and username joined in)
+rather than ORM objects, so no relationship is loaded per row.
 """
 
-from datetime import datetime
-from collections import defaultdict
+from datetime import datetime, timedelta
 
 
 def format_duration(seconds):
@@ -17,14 +20,13 @@ def format_duration(seconds):
     return f"{hours:d}:{minutes:02d}:{seconds:02d}"
 
 
-def prepare_export_data(entries):
-    """Prepare time entries data for export."""
-    data = []
+def iter_export_rows(entries):
+    """Yield export rows of time entry rows (see time_entry_rows_query) one at a time."""
     for entry in entries:
-        row = {
+        yield {
             'Date': entry.arrival_time.strftime('%Y-%m-%d'),
-            'Project Code': entry.project.code if entry.project else '',
-            'Project Name': entry.project.name if entry.project else '',
+            'Project Code': entry.project_code if entry.project_code is not None else '',
+            'Project Name': entry.project_name if entry.project_name is not None else '',
             'Arrival Time': entry.arrival_time.strftime('%H:%M:%S'),
             'Departure Time': entry.departure_time.strftime('%H:%M:%S') if entry.departure_time else 'Active',
             'Work Duration (HH:MM:SS)': format_duration(entry.duration) if entry.duration is not None else 'In progress',
@@ -33,8 +35,50 @@ def prepare_export_data(entries):
             'Break Duration (seconds)': entry.total_break_duration if entry.total_break_duration is not None else 0,
             'Notes': entry.notes if entry.notes else ''
         }
-        data.append(row)
-    return data
+
+
+def prepare_export_data(entries):
+    """Prepare time entries data for export."""
+    return list(iter_export_rows(entries))
+
+
+def analytics_export_headers(mode):
+    """Column headers of the detailed analytics export."""
+    headers = ['Date', 'Arrival Time', 'Departure Time', 'Duration', 'Break Duration', 'Project Code', 'Project Name', 'Notes']
+    if mode == 'team':
+        headers.insert(1, 'User')
+    return headers
+
+
+def iter_analytics_export_rows(entries, mode):
+    """Yield detailed analytics export rows in the order of analytics_export_headers()."""
+    for entry in entries:
+        row = [
+            entry.arrival_time.strftime('%Y-%m-%d'),
+            entry.arrival_time.strftime('%H:%M:%S'),
+            entry.departure_time.strftime('%H:%M:%S') if entry.departure_time else 'Active',
+            format_duration(entry.duration) if entry.duration else 'In progress',
+            format_duration(entry.total_break_duration),
+            entry.project_code if entry.project_code is not None else '',
+            entry.project_name if entry.project_name is not None else 'No Project',
+            entry.notes or ''
+        ]
+        if mode == 'team':
+            row.insert(1, entry.username)
+        yield row
+
+
+def summarize_hours_by_user(entries):
+    """Total hours and entry count of completed entries per username."""
+    user_data = {}
+    for entry in entries:
+        if entry.departure_time and entry.duration:
+            username = entry.username
+            if username not in user_data:
+                user_data[username] = {'hours': 0, 'entries': 0}
+            user_data[username]['hours'] += entry.duration / 3600
+            user_data[username]['entries'] += 1
+    return user_data
 
 
 def prepare_team_hours_export_data(team, team_data, date_range):
@@ -74,135 +118,90 @@ def format_table_data(entries):
             'departure_time': entry.departure_time.strftime('%H:%M:%S') if entry.departure_time else 'Active',
             'duration': format_duration(entry.duration) if entry.duration else 'In progress',
             'break_duration': format_duration(entry.total_break_duration),
-            'project_code': entry.project.code if entry.project else None,
-            'project_name': entry.project.name if entry.project else 'No Project',
+            'project_code': entry.project_code,
+            'project_name': entry.project_name if entry.project_name is not None else 'No Project',
             'notes': entry.notes or '',
-            'user_name': entry.user.username
+            'user_name': entry.username
         }
         formatted_entries.append(formatted_entry)
     
     return {'entries': formatted_entries}
 
 
-def format_graph_data(entries, granularity='daily'):
-    """Format data for graph visualization in analytics."""
-    # Group data by date
-    daily_data = defaultdict(lambda: {'total_hours': 0, 'projects': defaultdict(int)})
-    project_totals = defaultdict(int)
-    
-    for entry in entries:
-        if entry.departure_time and entry.duration:
-            date_key = entry.arrival_time.strftime('%Y-%m-%d')
-            hours = entry.duration / 3600  # Convert seconds to hours
-            
-            daily_data[date_key]['total_hours'] += hours
-            project_name = entry.project.name if entry.project else 'No Project'
-            daily_data[date_key]['projects'][project_name] += hours
-            project_totals[project_name] += hours
-    
-    # Format time series data
-    time_series = []
-    for date, data in sorted(daily_data.items()):
-        time_series.append({
-            'date': date,
-            'hours': round(data['total_hours'], 2)
-        })
-    
-    # Format project distribution
-    project_distribution = [
-        {'project': project, 'hours': round(hours, 2)}
-        for project, hours in project_totals.items()
-    ]
-    
-    return {
-        'timeSeries': time_series,
-        'projectDistribution': project_distribution,
-        'totalHours': sum(project_totals.values()),
-        'totalDays': len(daily_data)
-    }
+BURNDOWN_UNITS = ('tasks', 'hours')
 
 
-def format_team_data(entries, granularity='daily'):
-    """Format data for team view in analytics."""
-    # Group by user and date
-    user_data = defaultdict(lambda: {'daily_hours': defaultdict(float), 'total_hours': 0})
-    
-    for entry in entries:
-        if entry.departure_time and entry.duration:
-            date_key = entry.arrival_time.strftime('%Y-%m-%d')
-            hours = entry.duration / 3600
-            
-            user_data[entry.user.username]['daily_hours'][date_key] += hours
-            user_data[entry.user.username]['total_hours'] += hours
-    
-    # Format for frontend
-    team_data = []
-    for username, data in user_data.items():
-        team_data.append({
-            'username': username,
-            'daily_hours': dict(data['daily_hours']),
-            'total_hours': round(data['total_hours'], 2)
-        })
-    
-    return {'team_data': team_data}
+def _parse_date(value):
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    return value
 
 
-def format_burndown_data(tasks, start_date, end_date):
-    """Format data for burndown chart visualization."""
-    from datetime import datetime, timedelta
-    from models import Task, TaskStatus
-    
-    if not tasks:
+def format_burndown_counts(task_counts, start_date, end_date, unit='tasks'):
+    """
+    Format burndown chart data from task counts per completion date.
+
+    Remaining work is swept day by day: completions are summed per date
+    once, and each day subtracts the work completed on it from the day
+    before, instead of checking every task on every day.
+
+    Args:
+        task_counts: (is_done, completed_date, task count, estimated hours)
+            rows, as returned by routes.tasks.get_burndown_task_counts()
+        unit: 'tasks' or 'hours'
+    """
+    if not task_counts:
         return {'burndown': {'dates': [], 'remaining': [], 'ideal': []}}
-    
-    # Convert string dates to datetime objects if needed
-    if isinstance(start_date, str):
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-    if isinstance(end_date, str):
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-    
-    # Generate date range
-    current_date = start_date
+
+    start_date = _parse_date(start_date)
+    end_date = _parse_date(end_date)
+    by_hours = unit == 'hours'
+
+    total_tasks = 0
+    total_work = 0
+    done_before_start = 0
+    completed_on = {}
+    for is_done, completed_date, count, hours in task_counts:
+        work = (hours or 0) if by_hours else count
+        total_tasks += count
+        total_work += work
+        if not is_done:
+            continue
+        # Completed tasks without a completion date count as done all along
+        if completed_date is None or completed_date < start_date:
+            done_before_start += work
+        elif completed_date <= end_date:
+            completed_on[completed_date] = completed_on.get(completed_date, 0) + work
+
+    # Sweep over the date range
     dates = []
+    actual_remaining = []
+    remaining = total_work - done_before_start
+    current_date = start_date
     while current_date <= end_date:
+        remaining -= completed_on.get(current_date, 0)
         dates.append(current_date.strftime('%Y-%m-%d'))
+        actual_remaining.append(round(remaining, 2) if by_hours else remaining)
         current_date += timedelta(days=1)
-    
-    total_tasks = len(tasks)
-    if total_tasks == 0:
-        return {'burndown': {'dates': dates, 'remaining': [0] * len(dates), 'ideal': [0] * len(dates)}}
-    
+
     # Calculate ideal burndown (linear decrease from total to 0)
     total_days = len(dates)
     ideal_burndown = []
     for i in range(total_days):
-        remaining_ideal = total_tasks - (total_tasks * i / (total_days - 1)) if total_days > 1 else 0
+        remaining_ideal = total_work - (total_work * i / (total_days - 1)) if total_days > 1 else 0
         ideal_burndown.append(max(0, round(remaining_ideal, 1)))
-    
-    # Calculate actual remaining tasks for each date
-    actual_remaining = []
-    for date_str in dates:
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
-        
-        # Count tasks not completed by this date
-        remaining_count = 0
-        for task in tasks:
-            # Task is remaining if:
-            # 1. It's not completed, OR
-            # 2. It was completed after this date
-            if task.status != TaskStatus.DONE:
-                remaining_count += 1
-            elif task.completed_date and task.completed_date > date_obj:
-                remaining_count += 1
-        
-        actual_remaining.append(remaining_count)
-    
-    return {
-        'burndown': {
-            'dates': dates,
-            'remaining': actual_remaining,
-            'ideal': ideal_burndown,
-            'total_tasks': total_tasks,
-            'tasks_completed': total_tasks - (actual_remaining[-1] if actual_remaining else total_tasks)
-        }
-    }
\ No newline at end of file
+
+    remaining_work = actual_remaining[-1] if actual_remaining else total_work
+    burndown = {
+        'dates': dates,
+        'remaining': actual_remaining,
+        'ideal': ideal_burndown,
+        'unit': unit,
+        'total_tasks': total_tasks
+    }
+    if by_hours:
+        burndown['total_hours'] = round(total_work, 2)
+        burndown['hours_completed'] = round(total_work - remaining_work, 2)
+    else:
+        burndown['tasks_completed'] = total_work - remaining_work
+    return {'burndown': burndown}
\ No newline at end of file
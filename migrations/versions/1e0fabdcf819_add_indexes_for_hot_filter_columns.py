@@ -0,0 +1,41 @@
+"""Add indexes for hot foreign key and filter columns
+
+Revision ID: 1e0fabdcf819
+Revises: 344b09d79503
+Create Date: 2026-10-18 10:41:05.873310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '1e0fabdcf819'
+down_revision = '344b09d79503'
+branch_labels = None
+depends_on = None
+
+# note.company_id, user.company_id and project.company_id are already covered
+# by the leading column of their per-company unique constraints, and
+# time_entry.user_id by idx_time_entry_user_arrival.
+INDEXES = [
+    ('idx_time_entry_project', 'time_entry', ['project_id']),
+    ('idx_time_entry_task', 'time_entry', ['task_id']),
+    ('idx_task_project', 'task', ['project_id']),
+    ('idx_task_assigned_to', 'task', ['assigned_to_id']),
+    ('idx_task_sprint', 'task', ['sprint_id']),
+    ('idx_sub_task_task', 'sub_task', ['task_id']),
+    ('idx_task_dependency_blocking', 'task_dependency', ['blocking_task_id']),
+    ('idx_system_event_timestamp', 'system_event', ['timestamp']),
+    ('idx_user_team', 'user', ['team_id']),
+    ('idx_sprint_company', 'sprint', ['company_id']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
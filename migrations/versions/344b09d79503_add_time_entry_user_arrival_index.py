@@ -0,0 +1,23 @@
+"""Add composite (user_id, arrival_time) index on time_entry
+
+Revision ID: 344b09d79503
+Revises: ebb43d0e8758
+Create Date: 2026-10-18 10:03:47.219584
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '344b09d79503'
+down_revision = 'ebb43d0e8758'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_time_entry_user_arrival', 'time_entry', ['user_id', 'arrival_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_time_entry_user_arrival', table_name='time_entry')
@@ -0,0 +1,46 @@
+"""Add export_job table for background exports
+
+Revision ID: 5b7c2e9a41d3
+Revises: 1e0fabdcf819
+Create Date: 2026-10-18 13:12:47.209516
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5b7c2e9a41d3'
+down_revision = '1e0fabdcf819'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('export_job',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=True),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('export_format', sa.String(length=10), nullable=False),
+        sa.Column('params', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('row_count', sa.Integer(), nullable=True),
+        sa.Column('file_path', sa.String(length=500), nullable=True),
+        sa.Column('filename', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['company_id'], ['company.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_export_job_user', 'export_job', ['user_id'], unique=False)
+    op.create_index('idx_export_job_expires', 'export_job', ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_export_job_expires', table_name='export_job')
+    op.drop_index('idx_export_job_user', table_name='export_job')
+    op.drop_table('export_job')
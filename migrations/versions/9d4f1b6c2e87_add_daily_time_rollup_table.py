@@ -0,0 +1,64 @@
+"""Add daily_time_rollup table
+
+Revision ID: 9d4f1b6c2e87
+Revises: 5b7c2e9a41d3
+Create Date: 2026-10-18 15:02:31.418220
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '9d4f1b6c2e87'
+down_revision = '5b7c2e9a41d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_time_rollup',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('project_id', sa.Integer(), nullable=True),
+        sa.Column('task_id', sa.Integer(), nullable=True),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('total_duration', sa.Integer(), nullable=False),
+        sa.Column('total_break_duration', sa.Integer(), nullable=False),
+        sa.Column('entry_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['project_id'], ['project.id'], ),
+        sa.ForeignKeyConstraint(['task_id'], ['task.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_daily_time_rollup_key', 'daily_time_rollup',
+                    ['user_id', 'date', 'project_id', 'task_id'], unique=False)
+    op.create_index('idx_daily_time_rollup_project', 'daily_time_rollup',
+                    ['project_id', 'date'], unique=False)
+    # NULLs never conflict in a unique index, so the nullable key columns go through COALESCE
+    op.create_index('uq_daily_time_rollup_key', 'daily_time_rollup',
+                    [sa.text('COALESCE(user_id, 0)'), sa.text('COALESCE(project_id, 0)'),
+                     sa.text('COALESCE(task_id, 0)'), 'date'], unique=True)
+
+    # Roll up the existing completed entries, as `flask rebuild-time-rollups` does
+    if op.get_bind().dialect.name == 'sqlite':
+        day = 'date(arrival_time)'
+    else:
+        day = 'CAST(arrival_time AS DATE)'
+    op.execute(f"""
+        INSERT INTO daily_time_rollup (user_id, project_id, task_id, date,
+                                       total_duration, total_break_duration, entry_count, updated_at)
+        SELECT user_id, project_id, task_id, {day},
+               COALESCE(SUM(duration), 0), COALESCE(SUM(total_break_duration), 0), COUNT(id),
+               CURRENT_TIMESTAMP
+        FROM time_entry
+        WHERE departure_time IS NOT NULL
+        GROUP BY user_id, project_id, task_id, {day}
+    """)
+
+
+def downgrade():
+    op.drop_index('uq_daily_time_rollup_key', table_name='daily_time_rollup')
+    op.drop_index('idx_daily_time_rollup_project', table_name='daily_time_rollup')
+    op.drop_index('idx_daily_time_rollup_key', table_name='daily_time_rollup')
+    op.drop_table('daily_time_rollup')
@@ -0,0 +1,83 @@
+"""Add normalized announcement targeting tables
+
+Revision ID: ebb43d0e8758
+Revises: 85d490db548b
+Create Date: 2026-10-18 09:12:31.482113
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'ebb43d0e8758'
+down_revision = '85d490db548b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('announcement_target_role',
+        sa.Column('announcement_id', sa.Integer(), nullable=False),
+        sa.Column('role', sa.String(length=50), nullable=False),
+        sa.ForeignKeyConstraint(['announcement_id'], ['announcement.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('announcement_id', 'role')
+    )
+    op.create_index('idx_announcement_target_role', 'announcement_target_role', ['role'], unique=False)
+
+    op.create_table('announcement_target_company',
+        sa.Column('announcement_id', sa.Integer(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['announcement_id'], ['announcement.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['company_id'], ['company.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('announcement_id', 'company_id')
+    )
+    op.create_index('idx_announcement_target_company', 'announcement_target_company', ['company_id'], unique=False)
+
+    op.create_index('idx_announcement_active_window', 'announcement',
+                    ['is_active', 'start_date', 'end_date'], unique=False)
+
+    # Backfill the target rows from the existing JSON columns
+    connection = op.get_bind()
+    announcements = connection.execute(sa.text(
+        "SELECT id, target_roles, target_companies FROM announcement "
+        "WHERE target_roles IS NOT NULL OR target_companies IS NOT NULL"
+    )).fetchall()
+    company_ids = {row[0] for row in connection.execute(sa.text("SELECT id FROM company"))}
+
+    for announcement_id, target_roles, target_companies in announcements:
+        # Unreadable JSON never restricted is_visible_to_user(), so it is
+        # cleared rather than left to match nobody
+        try:
+            roles = json.loads(target_roles) if target_roles else []
+        except (json.JSONDecodeError, TypeError):
+            roles = []
+            connection.execute(sa.text(
+                "UPDATE announcement SET target_roles = NULL WHERE id = :aid"
+            ), {'aid': announcement_id})
+        try:
+            companies = json.loads(target_companies) if target_companies else []
+        except (json.JSONDecodeError, TypeError):
+            companies = []
+            connection.execute(sa.text(
+                "UPDATE announcement SET target_companies = NULL WHERE id = :aid"
+            ), {'aid': announcement_id})
+
+        for role in set(roles):
+            connection.execute(sa.text(
+                "INSERT INTO announcement_target_role (announcement_id, role) VALUES (:aid, :role)"
+            ), {'aid': announcement_id, 'role': role})
+        for company_id in set(companies):
+            if company_id in company_ids:
+                connection.execute(sa.text(
+                    "INSERT INTO announcement_target_company (announcement_id, company_id) VALUES (:aid, :cid)"
+                ), {'aid': announcement_id, 'cid': company_id})
+
+
+def downgrade():
+    op.drop_index('idx_announcement_active_window', table_name='announcement')
+    op.drop_index('idx_announcement_target_company', table_name='announcement_target_company')
+    op.drop_table('announcement_target_company')
+    op.drop_index('idx_announcement_target_role', table_name='announcement_target_role')
+    op.drop_table('announcement_target_role')
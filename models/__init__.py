@@ -20,14 +20,16 @@ from .team import Team
 from .project import Project, ProjectCategory
 from .task import Task, TaskDependency, SubTask, Comment
 from .time_entry import TimeEntry
+from .time_rollup import DailyTimeRollup
 from .sprint import Sprint
 from .system import SystemSettings, BrandingSettings, SystemEvent
-from .announcement import Announcement
+from .announcement import Announcement, AnnouncementTargetRole, AnnouncementTargetCompany
 from .dashboard import DashboardWidget, WidgetTemplate
 from .work_config import WorkConfig
 from .invitation import CompanyInvitation
 from .note import Note, NoteVisibility, NoteLink, NoteFolder
 from .note_share import NoteShare
+from .export_job import ExportJob
 
 # Make all models available at package level
 __all__ = [
@@ -41,12 +43,13 @@ __all__ = [
     'Team',
     'Project', 'ProjectCategory',
     'Task', 'TaskDependency', 'SubTask', 'Comment',
-    'TimeEntry',
+    'TimeEntry', 'DailyTimeRollup',
     'Sprint',
     'SystemSettings', 'BrandingSettings', 'SystemEvent',
-    'Announcement',
+    'Announcement', 'AnnouncementTargetRole', 'AnnouncementTargetCompany',
     'DashboardWidget', 'WidgetTemplate',
     'WorkConfig',
     'CompanyInvitation',
-    'Note', 'NoteVisibility', 'NoteLink', 'NoteFolder', 'NoteShare'
+    'Note', 'NoteVisibility', 'NoteLink', 'NoteFolder', 'NoteShare',
+    'ExportJob'
 ]
\ No newline at end of file
@@ -2,10 +2,17 @@
 Announcement model for system-wide notifications
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
+import threading
+from sqlalchemy import and_, event, exists, func, or_
+from sqlalchemy.orm import make_transient_to_detached
 from . import db
 
+# Visible announcements per (role, company), see get_active_announcements_for_user
+_visible_cache = {}
+_visible_cache_lock = threading.Lock()
+
 
 class Announcement(db.Model):
     """System-wide announcements"""
@@ -34,6 +41,18 @@ class Announcement(db.Model):
 
     # Relationships
     created_by = db.relationship('User', foreign_keys=[created_by_id])
+    role_targets = db.relationship('AnnouncementTargetRole', backref='announcement',
+                                   cascade='all, delete-orphan')
+    company_targets = db.relationship('AnnouncementTargetCompany', backref='announcement',
+                                      cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('idx_announcement_active_window', 'is_active', 'start_date', 'end_date'),
+    )
+
+    # Cached results are reloaded at least this often so that changes made in
+    # other worker processes become visible
+    CACHE_MAX_AGE = timedelta(seconds=60)
 
     def __repr__(self):
         return f'<Announcement {self.title}>'
@@ -84,8 +103,133 @@ class Announcement(db.Model):
 
         return True
 
+    def set_targets(self, roles=None, company_ids=None):
+        """Set role/company targeting, keeping the JSON columns and target rows in sync"""
+        # Duplicates from the form would repeat a target row's primary key
+        roles = list(dict.fromkeys(roles or []))
+        company_ids = list(dict.fromkeys(int(c) for c in (company_ids or [])))
+
+        self.target_roles = json.dumps(roles) if roles else None
+        self.target_companies = json.dumps(company_ids) if company_ids else None
+        self.role_targets = [AnnouncementTargetRole(role=role) for role in roles]
+        self.company_targets = [AnnouncementTargetCompany(company_id=company_id)
+                                for company_id in company_ids]
+
+    @staticmethod
+    def targeted_at(role_value, company_id):
+        """
+        SQL clause matching announcements whose targeting includes the role and company
+
+        The JSON columns tell whether an announcement is targeted at all; an
+        announcement targeted at companies that have all been deleted has no
+        target rows left and matches nobody, as in is_visible_to_user().
+        """
+        role_match = AnnouncementTargetRole.announcement_id == Announcement.id
+        company_match = AnnouncementTargetCompany.announcement_id == Announcement.id
+        return or_(
+            Announcement.target_all_users == True,
+            and_(
+                or_(Announcement.target_roles.is_(None),
+                    exists().where(and_(role_match, AnnouncementTargetRole.role == role_value))),
+                or_(Announcement.target_companies.is_(None),
+                    exists().where(and_(company_match,
+                                        AnnouncementTargetCompany.company_id == company_id)))
+            )
+        )
+
+    @staticmethod
+    def _load_visible(role_value, company_id, now):
+        """Query visible announcements and the time the result next changes"""
+        targeted = Announcement.targeted_at(role_value, company_id)
+
+        announcements = Announcement.query.filter(
+            Announcement.is_active == True,
+            or_(Announcement.start_date.is_(None), Announcement.start_date <= now),
+            or_(Announcement.end_date.is_(None), Announcement.end_date >= now),
+            targeted
+        ).order_by(Announcement.created_at.desc()).all()
+
+        next_start = db.session.query(func.min(Announcement.start_date)).filter(
+            Announcement.is_active == True,
+            Announcement.start_date > now,
+            targeted
+        ).scalar()
+
+        boundaries = [ann.end_date for ann in announcements if ann.end_date]
+        if next_start:
+            boundaries.append(next_start)
+        expires = now + Announcement.CACHE_MAX_AGE
+        if boundaries:
+            expires = min(expires, min(boundaries))
+        return announcements, expires
+
     @staticmethod
     def get_active_announcements_for_user(user):
-        """Get all active announcements visible to a specific user"""
-        announcements = Announcement.query.filter_by(is_active=True).all()
-        return [ann for ann in announcements if ann.is_visible_to_user(user)]
\ No newline at end of file
+        """Get all active announcements visible to a specific user
+
+        Results are memoized per (role, company) until the next start/end date
+        of a matching announcement, or until an announcement is changed.
+        """
+        role_value = user.role.value if user.role else None
+        key = (role_value, user.company_id)
+        now = datetime.now()
+
+        cached = _visible_cache.get(key)
+        if cached is None or cached['expires'] <= now:
+            announcements, expires = Announcement._load_visible(role_value, user.company_id, now)
+            cached = {
+                'rows': [
+                    {column.key: getattr(ann, column.key) for column in Announcement.__table__.columns}
+                    for ann in announcements
+                ],
+                'expires': expires,
+            }
+            with _visible_cache_lock:
+                _visible_cache[key] = cached
+
+        result = []
+        for row in cached['rows']:
+            ann = Announcement(**row)
+            make_transient_to_detached(ann)
+            result.append(ann)
+        return result
+
+    @staticmethod
+    def clear_cache():
+        """Drop all memoized announcement lookups"""
+        with _visible_cache_lock:
+            _visible_cache.clear()
+
+
+class AnnouncementTargetRole(db.Model):
+    """Role an announcement is targeted at"""
+    __tablename__ = 'announcement_target_role'
+
+    announcement_id = db.Column(db.Integer, db.ForeignKey('announcement.id', ondelete='CASCADE'),
+                                primary_key=True)
+    role = db.Column(db.String(50), primary_key=True)
+
+    __table_args__ = (
+        db.Index('idx_announcement_target_role', 'role'),
+    )
+
+
+class AnnouncementTargetCompany(db.Model):
+    """Company an announcement is targeted at"""
+    __tablename__ = 'announcement_target_company'
+
+    announcement_id = db.Column(db.Integer, db.ForeignKey('announcement.id', ondelete='CASCADE'),
+                                primary_key=True)
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id', ondelete='CASCADE'),
+                           primary_key=True)
+
+    __table_args__ = (
+        db.Index('idx_announcement_target_company', 'company_id'),
+    )
+
+
+@event.listens_for(Announcement, 'after_insert')
+@event.listens_for(Announcement, 'after_update')
+@event.listens_for(Announcement, 'after_delete')
+def _announcement_changed(mapper, connection, target):
+    Announcement.clear_cache()
@@ -0,0 +1,87 @@
+"""
+Export job model for exports produced in the background
+"""
+
+import json
+from datetime import datetime
+from . import db
+
+
+class ExportJob(db.Model):
+    """An export file generated outside the request that asked for it"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=True)
+
+    # What to export: 'time_entries' or 'analytics', 'csv' or 'excel'
+    kind = db.Column(db.String(50), nullable=False)
+    export_format = db.Column(db.String(10), nullable=False)
+    params = db.Column(db.Text, nullable=True)  # JSON encoded export options
+
+    # Status tracking
+    status = db.Column(db.String(20), default=PENDING, nullable=False)
+    error = db.Column(db.Text, nullable=True)
+    row_count = db.Column(db.Integer, nullable=True)
+
+    # Produced file
+    file_path = db.Column(db.String(500), nullable=True)
+    filename = db.Column(db.String(255), nullable=True)
+
+    # Metadata
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    started_at = db.Column(db.DateTime, nullable=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)
+
+    # Relationships
+    user = db.relationship('User', backref=db.backref('export_jobs', lazy='dynamic', cascade='all, delete-orphan'))
+
+    __table_args__ = (
+        db.Index('idx_export_job_user', 'user_id'),
+        db.Index('idx_export_job_expires', 'expires_at'),
+    )
+
+    @property
+    def params_dict(self):
+        """Export options as a dictionary"""
+        if self.params:
+            try:
+                return json.loads(self.params)
+            except (json.JSONDecodeError, TypeError):
+                return {}
+        return {}
+
+    @params_dict.setter
+    def params_dict(self, value):
+        self.params = json.dumps(value)
+
+    def is_expired(self):
+        """Check if the produced file is no longer available"""
+        return self.expires_at is not None and datetime.now() > self.expires_at
+
+    def is_ready(self):
+        """Check if the file can be downloaded"""
+        return self.status == self.COMPLETED and not self.is_expired()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'format': self.export_format,
+            'status': self.status,
+            'error': self.error,
+            'row_count': self.row_count,
+            'filename': self.filename,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'is_ready': self.is_ready()
+        }
+
+    def __repr__(self):
+        return f'<ExportJob {self.id} {self.kind} ({self.status})>'
@@ -40,6 +40,10 @@ class Sprint(db.Model):
     project = db.relationship('Project', backref='sprints')
     created_by = db.relationship('User', foreign_keys=[created_by_id])
     tasks = db.relationship('Task', backref='sprint', lazy=True)
+
+    __table_args__ = (
+        db.Index('idx_sprint_company', 'company_id'),
+    )
     
     def __repr__(self):
         return f'<Sprint {self.name}>'
@@ -47,9 +51,14 @@ class Sprint(db.Model):
     @property
     def is_current(self):
         """Check if this sprint is currently active"""
-        today = date.today()
-        return (self.status == SprintStatus.ACTIVE and 
-                self.start_date <= today <= self.end_date)
+        return self.is_current_period(self.status, self.start_date, self.end_date)
+
+    @staticmethod
+    def is_current_period(status, start_date, end_date, today=None):
+        """is_current for sprint columns selected without loading the sprint"""
+        today = today or date.today()
+        return (status == SprintStatus.ACTIVE and
+                start_date <= today <= end_date)
     
     @property
     def duration_days(self):
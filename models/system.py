@@ -17,6 +17,11 @@ class SystemSettings(db.Model):
     def __repr__(self):
         return f'<SystemSettings {self.key}={self.value}>'
 
+    @staticmethod
+    def get_all():
+        """Get all settings as a key -> value dictionary"""
+        return dict(db.session.query(SystemSettings.key, SystemSettings.value).all())
+
 
 class BrandingSettings(db.Model):
     """Branding and customization settings"""
@@ -86,6 +91,10 @@ class SystemEvent(db.Model):
     user = db.relationship('User', backref='system_events')
     company = db.relationship('Company', backref='system_events')
 
+    __table_args__ = (
+        db.Index('idx_system_event_timestamp', 'timestamp'),
+    )
+
     def __repr__(self):
         return f'<SystemEvent {self.event_type}: {self.description[:50]}>'
 
@@ -3,6 +3,7 @@ Task-related models
 """
 
 from datetime import datetime
+from sqlalchemy import event
 from . import db
 from .enums import TaskStatus, TaskPriority, CommentVisibility, Role
 from .project import Project
@@ -46,6 +47,12 @@ class Task(db.Model):
     subtasks = db.relationship('SubTask', backref='parent_task', lazy=True, cascade='all, delete-orphan')
     time_entries = db.relationship('TimeEntry', backref='task', lazy=True)
 
+    __table_args__ = (
+        db.Index('idx_task_project', 'project_id'),
+        db.Index('idx_task_assigned_to', 'assigned_to_id'),
+        db.Index('idx_task_sprint', 'sprint_id'),
+    )
+
     def __repr__(self):
         return f'<Task {self.name} ({self.status.value})>'
 
@@ -125,6 +132,7 @@ class TaskDependency(db.Model):
     __table_args__ = (
         db.CheckConstraint('blocked_task_id != blocking_task_id', name='no_self_blocking'),
         db.UniqueConstraint('blocked_task_id', 'blocking_task_id', name='unique_dependency'),
+        db.Index('idx_task_dependency_blocking', 'blocking_task_id'),
     )
     
     def __repr__(self):
@@ -163,6 +171,10 @@ class SubTask(db.Model):
     created_by = db.relationship('User', foreign_keys=[created_by_id])
     time_entries = db.relationship('TimeEntry', backref='subtask', lazy=True)
 
+    __table_args__ = (
+        db.Index('idx_sub_task_task', 'task_id'),
+    )
+
     def __repr__(self):
         return f'<SubTask {self.name} ({self.status.value})>'
 
@@ -242,4 +254,13 @@ class Comment(db.Model):
         if user.role == Role.TEAM_LEADER and self.task.project.team_id == user.team_id:
             return True
         
-        return False
\ No newline at end of file
+        return False
+
+
+@event.listens_for(SubTask, 'after_insert')
+@event.listens_for(SubTask, 'after_delete')
+def _subtask_added_or_removed(mapper, connection, target):
+    # Clients syncing tasks by updated_at don't see the subtask rows that are gone
+    connection.execute(
+        Task.__table__.update().where(Task.__table__.c.id == target.task_id).values(updated_at=datetime.now())
+    )
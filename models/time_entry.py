@@ -27,6 +27,13 @@ class TimeEntry(db.Model):
     # Optional notes/description for the time entry
     notes = db.Column(db.Text, nullable=True)
 
+    __table_args__ = (
+        # Per-user date range queries (dashboards, analytics, exports)
+        db.Index('idx_time_entry_user_arrival', 'user_id', 'arrival_time'),
+        db.Index('idx_time_entry_project', 'project_id'),
+        db.Index('idx_time_entry_task', 'task_id'),
+    )
+
     def __repr__(self):
         project_info = f" (Project: {self.project.code})" if self.project else ""
         return f'<TimeEntry {self.id}: {self.arrival_time} - {self.departure_time}{project_info}>'
\ No newline at end of file
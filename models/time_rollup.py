@@ -0,0 +1,50 @@
+"""
+Daily time rollup model, per day sums of completed time entries
+"""
+
+from datetime import datetime
+from sqlalchemy import func, literal_column
+from . import db
+
+
+class DailyTimeRollup(db.Model):
+    """
+    Summed time entries of one user, project and task on one day.
+
+    Rows are derived from time_entry and kept current by utils.time_rollup
+    whenever an entry is written; only entries with a departure time are
+    included. There is at most one row per user, project, task and day.
+    """
+    __tablename__ = 'daily_time_rollup'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=True)
+    task_id = db.Column(db.Integer, db.ForeignKey('task.id'), nullable=True)
+    date = db.Column(db.Date, nullable=False)  # Day of the entries' arrival time
+
+    # Sums over the day's completed entries
+    total_duration = db.Column(db.Integer, default=0, nullable=False)  # Seconds
+    total_break_duration = db.Column(db.Integer, default=0, nullable=False)  # Seconds
+    entry_count = db.Column(db.Integer, default=0, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        db.Index('idx_daily_time_rollup_key', 'user_id', 'date', 'project_id', 'task_id'),
+        db.Index('idx_daily_time_rollup_project', 'project_id', 'date'),
+    )
+
+    def __repr__(self):
+        return f'<DailyTimeRollup user {self.user_id} on {self.date}: {self.total_duration}s>'
+
+
+# One row per key; the nullable key columns are compared through COALESCE
+# because NULLs never conflict in a unique index. Rollups are upserted on it.
+ROLLUP_KEY_EXPRESSIONS = (
+    func.coalesce(DailyTimeRollup.user_id, literal_column('0')),
+    func.coalesce(DailyTimeRollup.project_id, literal_column('0')),
+    func.coalesce(DailyTimeRollup.task_id, literal_column('0')),
+    DailyTimeRollup.date,
+)
+db.Index('uq_daily_time_rollup_key', *ROLLUP_KEY_EXPRESSIONS, unique=True)
@@ -40,6 +40,7 @@ class User(db.Model):
     __table_args__ = (
         db.UniqueConstraint('company_id', 'username', name='uq_user_username_per_company'),
         db.UniqueConstraint('company_id', 'email', name='uq_user_email_per_company'),
+        db.Index('idx_user_team', 'team_id'),
     )
 
     # Two-Factor Authentication fields
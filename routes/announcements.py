@@ -6,7 +6,6 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from models import db, Announcement, Company, User, Role
 from routes.auth import system_admin_required
 from datetime import datetime
-import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -61,18 +60,6 @@ def create():
 
         # Handle targeting
         target_all_users = request.form.get('target_all_users') == 'on'
-        target_roles = None
-        target_companies = None
-
-        if not target_all_users:
-            selected_roles = request.form.getlist('target_roles')
-            selected_companies = request.form.getlist('target_companies')
-
-            if selected_roles:
-                target_roles = json.dumps(selected_roles)
-
-            if selected_companies:
-                target_companies = json.dumps([int(c) for c in selected_companies])
 
         announcement = Announcement(
             title=title,
@@ -83,11 +70,13 @@ def create():
             start_date=start_datetime,
             end_date=end_datetime,
             target_all_users=target_all_users,
-            target_roles=target_roles,
-            target_companies=target_companies,
             created_by_id=g.user.id
         )
 
+        if not target_all_users:
+            announcement.set_targets(request.form.getlist('target_roles'),
+                                     request.form.getlist('target_companies'))
+
         db.session.add(announcement)
         db.session.commit()
 
@@ -142,21 +131,10 @@ def edit(id):
         announcement.target_all_users = request.form.get('target_all_users') == 'on'
 
         if not announcement.target_all_users:
-            selected_roles = request.form.getlist('target_roles')
-            selected_companies = request.form.getlist('target_companies')
-
-            if selected_roles:
-                announcement.target_roles = json.dumps(selected_roles)
-            else:
-                announcement.target_roles = None
-
-            if selected_companies:
-                announcement.target_companies = json.dumps([int(c) for c in selected_companies])
-            else:
-                announcement.target_companies = None
+            announcement.set_targets(request.form.getlist('target_roles'),
+                                     request.form.getlist('target_companies'))
         else:
-            announcement.target_roles = None
-            announcement.target_companies = None
+            announcement.set_targets()
 
         announcement.updated_at = datetime.now()
 
@@ -64,8 +64,10 @@ def company_required(f):
             flash('You must be associated with a company to access this page.', 'error')
             return redirect(url_for('setup_company'))
         
-        # Set company context
-        g.company = Company.query.get(g.user.company_id)
+        # Set company context, reusing the one loaded with the user
+        company = getattr(g, 'company', None)
+        if company is None or company.id != g.user.company_id:
+            g.company = Company.query.get(g.user.company_id)
         if not g.company or not g.company.is_active:
             flash('Your company is not active. Please contact support.', 'error')
             return redirect(url_for('login'))
@@ -4,11 +4,15 @@ Handles data export functionality for time entries and analytics.
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, g
-from datetime import datetime, time, timedelta
-from models import db, TimeEntry, Role, Project
-from data_formatting import prepare_export_data
-from data_export import export_to_csv, export_to_excel
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from models import db, TimeEntry, Role, Project, User
+from data_formatting import iter_export_rows
+from data_export import export_to_csv, export_to_excel, EXPORT_BATCH_SIZE
+from time_utils import date_range_filter
 from routes.auth import login_required, company_required
+from routes.export_api import time_entry_rows_query
+from utils.time_windows import get_time_windows, get_user_timezone
 
 # Create blueprint
 export_bp = Blueprint('export', __name__, url_prefix='/export')
@@ -23,8 +27,9 @@ def export_page():
 
 
 def get_date_range(period, start_date_str=None, end_date_str=None):
-    """Get start and end date based on period or custom date range."""
-    today = datetime.now().date()
+    """Get start and end date based on period or custom date range, in the user's timezone."""
+    windows = get_time_windows(g.user)
+    today = windows.today
 
     if period:
         if period == 'today':
@@ -36,8 +41,10 @@ def get_date_range(period, start_date_str=None, end_date_str=None):
             start_date = today.replace(day=1)
             return start_date, today
         elif period == 'all':
-            earliest_entry = TimeEntry.query.order_by(TimeEntry.arrival_time).first()
-            start_date = earliest_entry.arrival_time.date() if earliest_entry else today
+            earliest_entry = TimeEntry.query.filter(
+                export_owner_filter(g.user)
+            ).order_by(TimeEntry.arrival_time).first()
+            start_date = windows.local_date(earliest_entry.arrival_time) if earliest_entry else today
             return start_date, today
     else:
         # Custom date range
@@ -49,6 +56,29 @@ def get_date_range(period, start_date_str=None, end_date_str=None):
             raise ValueError('Invalid date format')
 
 
+def export_owner_filter(user):
+    """Condition on TimeEntry for the entries a user may export: the company's for admins, else their own"""
+    if user.role == Role.ADMIN:
+        return TimeEntry.user_id.in_(select(User.id).where(User.company_id == user.company_id))
+    return TimeEntry.user_id == user.id
+
+
+def build_export_query(user, start_date, end_date):
+    """Query the rows of the time entries a user may export, in arrival order. Days start in the user's timezone."""
+    return time_entry_rows_query().filter(
+        export_owner_filter(user),
+        *date_range_filter(TimeEntry.arrival_time, start_date, end_date, get_user_timezone(user))
+    ).order_by(TimeEntry.arrival_time)
+
+
+def has_entries(user, start_date, end_date):
+    """Check for entries the user may export in the date range without loading them."""
+    return db.session.query(TimeEntry.id).filter(
+        export_owner_filter(user),
+        *date_range_filter(TimeEntry.arrival_time, start_date, end_date, get_user_timezone(user))
+    ).first() is not None
+
+
 @export_bp.route('/download')
 @login_required
 @company_required
@@ -68,27 +98,21 @@ def download_export():
         return redirect(url_for('export.export_page'))
 
     # Query entries within the date range
-    start_datetime = datetime.combine(start_date, time.min)
-    end_datetime = datetime.combine(end_date, time.max)
-
-    entries = TimeEntry.query.filter(
-        TimeEntry.arrival_time >= start_datetime,
-        TimeEntry.arrival_time <= end_datetime
-    ).order_by(TimeEntry.arrival_time).all()
-
-    if not entries:
+    if not has_entries(g.user, start_date, end_date):
         flash('No entries found for the selected date range.')
         return redirect(url_for('export.export_page'))
 
-    # Prepare data and filename
-    data = prepare_export_data(entries)
+    entries = build_export_query(g.user, start_date, end_date)
+
     filename = f"timetrack_export_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}"
 
     # Export based on format
+    # Rows are read from a server-side cursor and written as they are read
+    rows = iter_export_rows(entries.yield_per(EXPORT_BATCH_SIZE))
     if export_format == 'csv':
-        return export_to_csv(data, filename)
+        return export_to_csv(rows, filename)
     elif export_format == 'excel':
-        return export_to_excel(data, filename)
+        return export_to_excel(rows, filename)
     else:
         flash('Invalid export format.')
         return redirect(url_for('export.export_page'))
\ No newline at end of file
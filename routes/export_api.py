@@ -3,11 +3,16 @@ Export API routes for TimeTrack application.
 Handles API endpoints for data export functionality.
 """
 
-from flask import Blueprint, request, redirect, url_for, flash, g
+from flask import Blueprint, request, redirect, url_for, flash, g, jsonify, send_file, abort
 from datetime import datetime
-from models import Role
+from models import Role, ExportJob
 from routes.auth import login_required, role_required, company_required
-from data_export import export_analytics_csv, export_analytics_excel
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from data_export import export_analytics_csv, export_analytics_excel, EXPORT_BATCH_SIZE
+from utils.export_jobs import submit_export_job, FORMATS
+from utils.pagination import keyset_page, DEFAULT_PAGE_SIZE
+from utils.time_windows import get_user_timezone
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,39 +21,149 @@ logger = logging.getLogger(__name__)
 export_api_bp = Blueprint('export_api', __name__, url_prefix='/api')
 
 
-def get_filtered_analytics_data(user, mode, start_date=None, end_date=None, project_filter=None):
-    """Get filtered time entry data for analytics"""
-    from models import TimeEntry, User
-    from sqlalchemy import func
+def time_entry_rows_query():
+    """Query only the time entry columns export and analytics rows show, with their project and user"""
+    from models import db, TimeEntry, Project, User
+
+    return db.session.query(
+        TimeEntry.id, TimeEntry.user_id, TimeEntry.project_id,
+        TimeEntry.arrival_time, TimeEntry.departure_time,
+        TimeEntry.duration, TimeEntry.total_break_duration, TimeEntry.notes,
+        Project.code.label('project_code'),
+        Project.name.label('project_name'),
+        User.username.label('username')
+    ).outerjoin(Project, TimeEntry.project_id == Project.id
+    ).outerjoin(User, TimeEntry.user_id == User.id)
+
+
+def get_filtered_analytics_query(user, mode, start_date=None, end_date=None, project_filter=None, projection=False):
+    """
+    Build the filtered time entry query for analytics.
+
+    With projection the query returns the column rows of time_entry_rows_query()
+    the formatters take, otherwise TimeEntry objects.
+    """
+    from models import TimeEntry
+    from time_utils import date_range_filter
     
-    # Base query
-    query = TimeEntry.query
+    # Base query, with the project and user every row shows
+    if projection:
+        query = time_entry_rows_query()
+    else:
+        query = TimeEntry.query.options(joinedload(TimeEntry.project), joinedload(TimeEntry.user))
+
+    query = _filter_analytics_owner_and_project(query, TimeEntry, user, mode, project_filter)
+
+    # Apply date filters, days start at midnight in the user's timezone
+    query = query.filter(*date_range_filter(TimeEntry.arrival_time, start_date, end_date, get_user_timezone(user)))
+
+    return query.order_by(TimeEntry.arrival_time.desc())
+
+
+def _filter_analytics_owner_and_project(query, model, user, mode, project_filter):
+    """Apply the user/team and project filters to a query on TimeEntry or DailyTimeRollup"""
+    from models import User
 
     # Apply user/team filter
     if mode == 'personal':
-        query = query.filter(TimeEntry.user_id == user.id)
+        query = query.filter(model.user_id == user.id)
     elif mode == 'team' and user.team_id:
         team_user_ids = [u.id for u in User.query.filter_by(team_id=user.team_id).all()]
-        query = query.filter(TimeEntry.user_id.in_(team_user_ids))
-
-    # Apply date filters
-    if start_date:
-        query = query.filter(func.date(TimeEntry.arrival_time) >= start_date)
-    if end_date:
-        query = query.filter(func.date(TimeEntry.arrival_time) <= end_date)
+        query = query.filter(model.user_id.in_(team_user_ids))
 
     # Apply project filter
     if project_filter:
         if project_filter == 'none':
-            query = query.filter(TimeEntry.project_id.is_(None))
+            query = query.filter(model.project_id.is_(None))
         else:
             try:
                 project_id = int(project_filter)
-                query = query.filter(TimeEntry.project_id == project_id)
+                query = query.filter(model.project_id == project_id)
             except ValueError:
                 pass
 
-    return query.order_by(TimeEntry.arrival_time.desc()).all()
+    return query
+
+
+def get_filtered_rollup_query(user, mode, start_date=None, end_date=None, project_filter=None):
+    """
+    Build the daily time rollup query with the filters of get_filtered_analytics_query().
+
+    Rows are DailyTimeRollup objects joined with their project and user.
+    Rollup dates are server-local days (see TimeWindows.is_server_local).
+    """
+    from models import db, DailyTimeRollup, Project, User
+
+    query = db.session.query(DailyTimeRollup).outerjoin(
+        Project, DailyTimeRollup.project_id == Project.id
+    ).outerjoin(User, DailyTimeRollup.user_id == User.id)
+    query = _filter_analytics_owner_and_project(query, DailyTimeRollup, user, mode, project_filter)
+
+    if start_date:
+        query = query.filter(DailyTimeRollup.date >= start_date)
+    if end_date:
+        query = query.filter(DailyTimeRollup.date <= end_date)
+    return query
+
+
+def get_filtered_analytics_data(user, mode, start_date=None, end_date=None, project_filter=None, projection=False):
+    """Get filtered time entry data for analytics"""
+    return get_filtered_analytics_query(user, mode, start_date, end_date, project_filter, projection).all()
+
+
+# Table view sort parameter -> (column, descending)
+ANALYTICS_TABLE_SORTS = {
+    'newest': ('arrival_time', True),
+    'oldest': ('arrival_time', False),
+    'longest': ('duration', True),
+    'shortest': ('duration', False),
+}
+
+
+def get_analytics_table_page(user, mode, start_date=None, end_date=None, project_filter=None,
+                             cursor=None, limit=DEFAULT_PAGE_SIZE, sort='newest'):
+    """
+    Get one page of the analytics table view.
+
+    Pages continue after the (sort value, id) of the cursor instead of an
+    OFFSET, so later pages are as cheap as the first one.
+
+    Returns:
+        tuple: (rows, next page cursor or None, total number of rows or None)
+        The total is only counted for the first page.
+
+    Raises:
+        ValueError: If the sort is unknown, or the cursor malformed or made
+        for another sort
+    """
+    from models import TimeEntry
+
+    if sort not in ANALYTICS_TABLE_SORTS:
+        raise ValueError(f"Unknown sort {sort!r}")
+    column, descending = ANALYTICS_TABLE_SORTS[sort]
+    if column == 'duration':
+        # Active entries have no duration yet, sort them as zero
+        sort_column = func.coalesce(TimeEntry.duration, 0)
+    else:
+        sort_column = TimeEntry.arrival_time
+
+    query = get_filtered_analytics_query(user, mode, start_date, end_date, project_filter, projection=True)
+    rows, next_cursor = keyset_page(query, sort_column, TimeEntry.id, descending, cursor, limit, key=sort)
+
+    total_count = None
+    if not cursor:
+        total_count = query.with_entities(func.count(TimeEntry.id)).order_by(None).scalar()
+    return rows, next_cursor, total_count
+
+
+def get_analytics_mode_error(user, mode):
+    """Get the reason a user may not export analytics in a mode, if any"""
+    if mode == 'team':
+        if not user.team_id:
+            return 'No team assigned'
+        if user.role not in [Role.TEAM_LEADER, Role.SUPERVISOR, Role.ADMIN]:
+            return 'Insufficient permissions'
+    return None
 
 
 @export_api_bp.route('/analytics/export')
@@ -64,13 +179,10 @@ def analytics_export():
     project_filter = request.args.get('project_id')
 
     # Validate permissions
-    if mode == 'team':
-        if not g.user.team_id:
-            flash('No team assigned', 'error')
-            return redirect(url_for('analytics'))
-        if g.user.role not in [Role.TEAM_LEADER, Role.SUPERVISOR, Role.ADMIN]:
-            flash('Insufficient permissions', 'error')
-            return redirect(url_for('analytics'))
+    permission_error = get_analytics_mode_error(g.user, mode)
+    if permission_error:
+        flash(permission_error, 'error')
+        return redirect(url_for('analytics'))
 
     try:
         # Parse dates
@@ -80,12 +192,14 @@ def analytics_export():
             end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
 
         # Get data
-        data = get_filtered_analytics_data(g.user, mode, start_date, end_date, project_filter)
+        query = get_filtered_analytics_query(g.user, mode, start_date, end_date, project_filter, projection=True)
 
+        # Read from a server-side cursor, rows are written as they are read
+        entries = query.yield_per(EXPORT_BATCH_SIZE)
         if export_format == 'csv':
-            return export_analytics_csv(data, view_type, mode)
+            return export_analytics_csv(entries, view_type, mode)
         elif export_format == 'excel':
-            return export_analytics_excel(data, view_type, mode)
+            return export_analytics_excel(entries, view_type, mode)
         else:
             flash('Invalid export format', 'error')
             return redirect(url_for('analytics'))
@@ -93,4 +207,71 @@ def analytics_export():
     except Exception as e:
         logger.error(f"Error in analytics export: {str(e)}")
         flash('Error generating export', 'error')
-        return redirect(url_for('analytics'))
\ No newline at end of file
+        return redirect(url_for('analytics'))
+
+
+@export_api_bp.route('/export/jobs', methods=['POST'])
+@login_required
+@company_required
+def create_export_job():
+    """Start an export in the background and return its job id right away"""
+    from routes.export import get_date_range
+
+    data = request.get_json(silent=True) or request.form
+    kind = data.get('kind', 'time_entries')
+    export_format = data.get('format', 'csv')
+
+    if export_format not in FORMATS:
+        return jsonify({'success': False, 'message': 'Invalid export format'}), 400
+
+    try:
+        if kind == 'time_entries':
+            start_date, end_date = get_date_range(data.get('period'), data.get('start_date'), data.get('end_date'))
+            params = {'start_date': start_date.isoformat(), 'end_date': end_date.isoformat()}
+        elif kind == 'analytics':
+            mode = data.get('mode', 'personal')
+            permission_error = get_analytics_mode_error(g.user, mode)
+            if permission_error:
+                return jsonify({'success': False, 'message': permission_error}), 403
+            params = {'view': data.get('view', 'table'), 'mode': mode, 'project_id': data.get('project_id')}
+            for key in ('start_date', 'end_date'):
+                if data.get(key):
+                    params[key] = datetime.strptime(data[key], '%Y-%m-%d').date().isoformat()
+        else:
+            return jsonify({'success': False, 'message': 'Invalid export kind'}), 400
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid date format. Please use YYYY-MM-DD format.'}), 400
+
+    job = submit_export_job(g.user, kind, export_format, params)
+    return jsonify({
+        'success': True,
+        'job': job.to_dict(),
+        'status_url': url_for('export_api.export_job_status', job_id=job.id),
+        'download_url': url_for('export_api.download_export_job', job_id=job.id)
+    }), 202
+
+
+def _get_own_export_job(job_id):
+    return ExportJob.query.filter_by(id=job_id, user_id=g.user.id).first_or_404()
+
+
+@export_api_bp.route('/export/jobs/<int:job_id>')
+@login_required
+def export_job_status(job_id):
+    """Get the status of an export job"""
+    job = _get_own_export_job(job_id)
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+
+@export_api_bp.route('/export/jobs/<int:job_id>/download')
+@login_required
+def download_export_job(job_id):
+    """Download the file of a completed export job"""
+    job = _get_own_export_job(job_id)
+    if not job.is_ready() or not job.file_path:
+        abort(404)
+
+    try:
+        return send_file(job.file_path, as_attachment=True, download_name=job.filename)
+    except FileNotFoundError:
+        abort(404)
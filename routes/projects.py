@@ -5,10 +5,11 @@ Handles all project-related views and operations
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, g, abort
 from datetime import datetime
-from models import db, Project, Team, ProjectCategory, TimeEntry, Role, Task, User
+from models import db, Project, Team, ProjectCategory, TimeEntry, DailyTimeRollup, Role, Task, User
 from routes.auth import role_required, company_required, admin_required
 from utils.validation import FormValidator
 from utils.repository import ProjectRepository
+from utils.project_stats import get_project_progress
 
 projects_bp = Blueprint('projects', __name__, url_prefix='/admin/projects')
 
@@ -20,7 +21,9 @@ def admin_projects():
     project_repo = ProjectRepository()
     projects = project_repo.get_by_company_ordered(g.user.company_id, Project.created_at.desc())
     categories = ProjectCategory.query.filter_by(company_id=g.user.company_id).order_by(ProjectCategory.name).all()
-    return render_template('admin_projects.html', title='Project Management', projects=projects, categories=categories)
+    project_stats = get_project_progress([project.id for project in projects])
+    return render_template('admin_projects.html', title='Project Management', projects=projects,
+                           categories=categories, project_stats=project_stats)
 
 
 @projects_bp.route('/create', methods=['GET', 'POST'])
@@ -137,8 +140,10 @@ def edit_project(project_id):
     # Get available teams and categories for the form (company-scoped)
     teams = Team.query.filter_by(company_id=g.user.company_id).order_by(Team.name).all()
     categories = ProjectCategory.query.filter_by(company_id=g.user.company_id).order_by(ProjectCategory.name).all()
+    stats = get_project_progress([project.id])[project.id]
 
-    return render_template('edit_project.html', title='Edit Project', project=project, teams=teams, categories=categories)
+    return render_template('edit_project.html', title='Edit Project', project=project, teams=teams,
+                           categories=categories, stats=stats)
 
 
 @projects_bp.route('/delete/<int:project_id>', methods=['POST'])
@@ -171,6 +176,12 @@ def delete_project(project_id):
         TimeEntry.query.filter(TimeEntry.task_id.in_(
             db.session.query(Task.id).filter(Task.project_id == project_id)
         )).delete(synchronize_session=False)
+
+        # Bulk deletes skip the rollup maintenance, remove the entries' rollups too
+        DailyTimeRollup.query.filter(
+            (DailyTimeRollup.project_id == project_id) |
+            DailyTimeRollup.task_id.in_(db.session.query(Task.id).filter(Task.project_id == project_id))
+        ).delete(synchronize_session=False)
         
         # Delete comments on tasks in this project
         Comment.query.filter(Comment.task_id.in_(
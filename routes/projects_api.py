@@ -7,6 +7,8 @@ from flask import Blueprint, jsonify, request, g
 from sqlalchemy import or_ as sql_or
 from models import db, Project, ProjectCategory, Role
 from routes.auth import role_required, company_required, admin_required
+from utils.access_policy import project_access_filter
+from utils.task_dependencies import get_project_dependency_graph
 import logging
 
 logger = logging.getLogger(__name__)
@@ -139,20 +141,15 @@ def search_projects():
         if not query:
             return jsonify({'success': True, 'projects': []})
         
-        # Search projects the user has access to
-        projects = Project.query.filter(
-            Project.company_id == g.user.company_id,
+        # Search projects the user has access to, filtered before the limit
+        # so inaccessible matches don't crowd out accessible ones
+        accessible_projects = Project.query.filter(
+            project_access_filter(g.user),
             sql_or(
                 Project.code.ilike(f'%{query}%'),
                 Project.name.ilike(f'%{query}%')
             )
-        ).limit(10).all()
-        
-        # Filter projects user has access to
-        accessible_projects = [
-            project for project in projects 
-            if project.is_user_allowed(g.user)
-        ]
+        ).order_by(Project.code).limit(10).all()
         
         project_list = [
             {
@@ -167,4 +164,25 @@ def search_projects():
         
     except Exception as e:
         logger.error(f"Error in search_projects: {str(e)}")
-        return jsonify({'success': False, 'message': str(e)})
\ No newline at end of file
+        return jsonify({'success': False, 'message': str(e)})
+
+
+@projects_api_bp.route('/projects/<int:project_id>/dependency-graph')
+@role_required(Role.TEAM_MEMBER)
+@company_required
+def get_dependency_graph(project_id):
+    """Get the project's tasks in dependency order with earliest starts and the critical path"""
+    try:
+        project = Project.query.filter(
+            Project.id == project_id,
+            project_access_filter(g.user)
+        ).first()
+        if not project:
+            return jsonify({'success': False, 'message': 'Project not found'}), 404
+        
+        graph = get_project_dependency_graph(project.id)
+        return jsonify({'success': True, 'project_id': project.id, **graph})
+        
+    except Exception as e:
+        logger.error(f"Error getting dependency graph: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)})
@@ -7,6 +7,8 @@ from flask import Blueprint, jsonify, request, g
 from datetime import datetime
 from models import db, Role, Project, Sprint, SprintStatus, Task
 from routes.auth import login_required, role_required, company_required
+from utils.access_policy import sprint_access_filter
+from utils.project_stats import get_sprint_task_summaries
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,29 +22,15 @@ sprints_api_bp = Blueprint('sprints_api', __name__, url_prefix='/api')
 def get_sprints():
     """Get all sprints for the user's company"""
     try:
-        # Base query for sprints in user's company
-        query = Sprint.query.filter(Sprint.company_id == g.user.company_id)
-        
-        # Apply access restrictions based on user role and team
-        if g.user.role not in [Role.ADMIN, Role.SUPERVISOR]:
-            # Regular users can only see sprints they have access to
-            accessible_sprint_ids = []
-            sprints = query.all()
-            for sprint in sprints:
-                if sprint.can_user_access(g.user):
-                    accessible_sprint_ids.append(sprint.id)
-            
-            if accessible_sprint_ids:
-                query = query.filter(Sprint.id.in_(accessible_sprint_ids))
-            else:
-                # No accessible sprints, return empty list
-                return jsonify({'success': True, 'sprints': []})
+        # Sprints of the user's company they have access to
+        query = Sprint.query.filter(sprint_access_filter(g.user))
         
         sprints = query.order_by(Sprint.created_at.desc()).all()
+        task_summaries = get_sprint_task_summaries([sprint.id for sprint in sprints])
         
         sprint_list = []
         for sprint in sprints:
-            task_summary = sprint.get_task_summary()
+            task_summary = task_summaries[sprint.id]
             
             sprint_data = {
                 'id': sprint.id,
@@ -3,12 +3,13 @@ System Administrator routes
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, g, current_app
-from models import (db, Company, User, Role, Team, Project, TimeEntry, SystemSettings, 
+from models import (db, Company, User, Role, Team, Project, TimeEntry, DailyTimeRollup, SystemSettings, 
                    SystemEvent, BrandingSettings, Task, SubTask, TaskDependency, Sprint, 
                    Comment, UserPreferences, UserDashboard, WorkConfig, CompanySettings, 
                    CompanyWorkConfig, ProjectCategory, Note, NoteFolder, NoteShare, 
-                   Announcement, CompanyInvitation)
+                   Announcement, AnnouncementTargetCompany, CompanyInvitation)
 from routes.auth import system_admin_required
+from time_utils import date_range_filter
 from flask import session
 from sqlalchemy import func
 from datetime import datetime, timedelta
@@ -174,6 +175,12 @@ def delete_company(company_id):
     try:
         # Delete all related data in the correct order to avoid foreign key constraints
         
+        # Delete daily time rollups (they reference users, projects and tasks)
+        DailyTimeRollup.query.filter(
+            DailyTimeRollup.user_id.in_(db.session.query(User.id).filter(User.company_id == company_id)) |
+            DailyTimeRollup.project_id.in_(db.session.query(Project.id).filter(Project.company_id == company_id))
+        ).delete(synchronize_session=False)
+        
         # Delete comments (must be before tasks)
         Comment.query.filter(Comment.task_id.in_(
             db.session.query(Task.id).join(Project).filter(Project.company_id == company_id)
@@ -242,6 +249,17 @@ def delete_company(company_id):
         # Delete announcements
         Announcement.query.filter(Announcement.created_by_id.in_(user_ids_subquery)).delete(synchronize_session=False)
         
+        # Deactivate announcements aimed only at this company, their audience is gone
+        other_company_targets = db.session.query(AnnouncementTargetCompany.announcement_id).filter(
+            AnnouncementTargetCompany.company_id != company_id
+        )
+        Announcement.query.filter(
+            Announcement.id.in_(db.session.query(AnnouncementTargetCompany.announcement_id).filter_by(company_id=company_id)),
+            ~Announcement.id.in_(other_company_targets)
+        ).update({Announcement.is_active: False}, synchronize_session=False)
+        AnnouncementTargetCompany.query.filter_by(company_id=company_id).delete(synchronize_session=False)
+        Announcement.clear_cache()
+        
         # Delete invitations
         CompanyInvitation.query.filter(
             (CompanyInvitation.invited_by_id.in_(user_ids_subquery)) | 
@@ -453,7 +471,7 @@ def system_admin_health():
     # Recent activity stats
     today = now.date()
     today_events = SystemEvent.query.filter(
-        func.date(SystemEvent.timestamp) == today
+        *date_range_filter(SystemEvent.timestamp, today, today)
     ).count()
     
     # Calculate 24-hour error and warning counts
@@ -4,15 +4,16 @@ Handles all task-related views and operations
 """
 
 from flask import Blueprint, render_template, g, redirect, url_for, flash
-from sqlalchemy import or_
-from models import db, Role, Project, Task, User
+from sqlalchemy import or_, false, func
+from models import db, Role, Project, Task, TaskPriority, TaskStatus, User
 from routes.auth import login_required, role_required, company_required
+from utils.access_policy import accessible_projects_query
 
 tasks_bp = Blueprint('tasks', __name__, url_prefix='/tasks')
 
 
-def get_filtered_tasks_for_burndown(user, mode, start_date=None, end_date=None, project_filter=None):
-    """Get filtered tasks for burndown chart"""
+def get_filtered_tasks_query_for_burndown(user, mode, start_date=None, end_date=None, project_filter=None):
+    """Build the filtered task query for burndown charts"""
     from datetime import datetime, time
     
     # Base query - get tasks from user's company
@@ -33,7 +34,7 @@ def get_filtered_tasks_for_burndown(user, mode, start_date=None, end_date=None,
     if project_filter:
         if project_filter == 'none':
             # No project filter for tasks - they must belong to a project
-            return []
+            return query.filter(false())
         else:
             try:
                 project_id = int(project_filter)
@@ -52,7 +53,22 @@ def get_filtered_tasks_for_burndown(user, mode, start_date=None, end_date=None,
             Task.created_at <= datetime.combine(end_date, time.max)
         )
     
-    return query.order_by(Task.created_at.desc()).all()
+    return query
+
+
+def get_burndown_task_counts(user, mode, start_date=None, end_date=None, project_filter=None):
+    """
+    Count the filtered tasks per completion date in SQL.
+
+    Returns:
+        list: (is_done, completed_date, task count, estimated hours) rows for
+        data_formatting.format_burndown_counts()
+    """
+    query = get_filtered_tasks_query_for_burndown(user, mode, start_date, end_date, project_filter)
+    is_done = (Task.status == TaskStatus.DONE).label('is_done')
+    return query.with_entities(
+        is_done, Task.completed_date, func.count(Task.id), func.sum(Task.estimated_hours)
+    ).group_by(is_done, Task.completed_date).all()
 
 
 @tasks_bp.route('')
@@ -62,29 +78,7 @@ def unified_task_management():
     """Unified task management interface"""
     
     # Get all projects the user has access to (for filtering and task creation)
-    if g.user.role in [Role.ADMIN, Role.SUPERVISOR]:
-        # Admins and Supervisors can see all company projects
-        available_projects = Project.query.filter_by(
-            company_id=g.user.company_id, 
-            is_active=True
-        ).order_by(Project.name).all()
-    elif g.user.team_id:
-        # Team members see team projects + unassigned projects
-        available_projects = Project.query.filter(
-            Project.company_id == g.user.company_id,
-            Project.is_active == True,
-            or_(Project.team_id == g.user.team_id, Project.team_id == None)
-        ).order_by(Project.name).all()
-        # Filter by actual access permissions
-        available_projects = [p for p in available_projects if p.is_user_allowed(g.user)]
-    else:
-        # Unassigned users see only unassigned projects
-        available_projects = Project.query.filter_by(
-            company_id=g.user.company_id,
-            team_id=None,
-            is_active=True
-        ).order_by(Project.name).all()
-        available_projects = [p for p in available_projects if p.is_user_allowed(g.user)]
+    available_projects = accessible_projects_query(g.user).order_by(Project.name).all()
     
     # Get team members for task assignment (company-scoped)
     if g.user.role in [Role.ADMIN, Role.SUPERVISOR]:
@@ -123,6 +117,8 @@ def unified_task_management():
     return render_template('unified_task_management.html',
                          title='Task Management',
                          available_projects=available_projects,
-                         team_members=team_members_data)
+                         team_members=team_members_data,
+                         task_statuses=[status.name for status in TaskStatus],
+                         task_priorities=[priority.name for priority in TaskPriority])
 
 
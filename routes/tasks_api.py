@@ -5,9 +5,13 @@ Handles all task-related API endpoints including subtasks and dependencies
 
 from flask import Blueprint, jsonify, request, g
 from datetime import datetime
+from sqlalchemy import func, or_
 from models import (db, Role, Project, Task, User, TaskStatus, TaskPriority, SubTask, 
-                   TaskDependency, Sprint, CompanySettings, Comment, CommentVisibility)
+                   TaskDependency, Sprint, SprintStatus, CompanySettings, Comment, CommentVisibility)
 from routes.auth import login_required, role_required, company_required
+from utils.access_policy import project_access_filter
+from utils.pagination import keyset_page, parse_page_size
+from utils.task_dependencies import would_create_cycle, DependencyGraph
 import logging
 
 logger = logging.getLogger(__name__)
@@ -195,83 +199,233 @@ def delete_task(task_id):
         return jsonify({'success': False, 'message': str(e)})
 
 
+def _parse_enum_names(enum, value):
+    """Enum members of a comma separated list of names"""
+    try:
+        return [enum[name.strip()] for name in value.split(',') if name.strip()]
+    except KeyError as e:
+        raise ValueError(f"Invalid value {e}")
+
+
+def _filter_unified_tasks(query, args):
+    """
+    Apply the filter parameters of /api/tasks/unified.
+
+    Raises:
+        ValueError: If a parameter has an invalid value
+    """
+    if args.get('status'):
+        query = query.filter(Task.status.in_(_parse_enum_names(TaskStatus, args['status'])))
+    if args.get('priority'):
+        query = query.filter(Task.priority.in_(_parse_enum_names(TaskPriority, args['priority'])))
+    if args.get('project_id'):
+        query = query.filter(Task.project_id == int(args['project_id']))
+
+    assignee = args.get('assigned_to_id')
+    if assignee == 'unassigned':
+        query = query.filter(Task.assigned_to_id.is_(None))
+    elif assignee:
+        query = query.filter(Task.assigned_to_id == int(assignee))
+
+    sprint = args.get('sprint_id')
+    if sprint == 'none':
+        query = query.filter(Task.sprint_id.is_(None))
+    elif sprint == 'current':
+        today = datetime.now().date()
+        query = query.filter(
+            Sprint.status == SprintStatus.ACTIVE,
+            Sprint.start_date <= today,
+            Sprint.end_date >= today
+        )
+    elif sprint:
+        query = query.filter(Task.sprint_id == int(sprint))
+
+    text = (args.get('q') or '').strip()
+    if text:
+        pattern = f'%{text}%'
+        query = query.filter(or_(
+            Task.name.ilike(pattern),
+            Task.description.ilike(pattern),
+            Task.task_number.ilike(pattern)
+        ))
+
+    # Delta mode: only tasks changed since the last sync, subtask edits included
+    if args.get('updated_since'):
+        since = datetime.fromisoformat(args['updated_since'])
+        query = query.filter(or_(
+            Task.updated_at >= since,
+            Task.id.in_(db.session.query(SubTask.task_id).filter(SubTask.updated_at >= since))
+        ))
+
+    return query
+
+
+def _unified_tasks_query(args):
+    """
+    Tasks of the projects in the user's company they have access to, filtered.
+
+    Raises:
+        ValueError: If a filter parameter has an invalid value
+    """
+    query = Task.query.join(Project).filter(project_access_filter(g.user))
+    query = query.outerjoin(Sprint, Task.sprint_id == Sprint.id)
+    return _filter_unified_tasks(query, args)
+
+
 @tasks_api_bp.route('/tasks/unified')
 @role_required(Role.TEAM_MEMBER)
 @company_required
 def get_unified_tasks():
-    """Get all tasks for unified task view"""
+    """
+    Get tasks for unified task view, newest first, one page at a time.
+
+    Query parameters:
+        status, priority: Comma separated enum names
+        project_id, assigned_to_id ('unassigned'), sprint_id ('none', 'current')
+        q: Text in the task number, name or description
+        updated_since: ISO datetime, only tasks changed since then; pass the
+            server_time of the previous response
+        cursor, limit: Keyset pagination, see utils.pagination
+    """
+    # Taken before querying, so changes made meanwhile show up in the next delta
+    server_time = datetime.now()
     try:
-        # Base query for tasks in user's company
-        query = Task.query.join(Project).filter(Project.company_id == g.user.company_id)
-        
-        # Apply access restrictions based on user role and team
-        if g.user.role not in [Role.ADMIN, Role.SUPERVISOR]:
-            # Regular users can only see tasks from projects they have access to
-            accessible_project_ids = []
-            projects = Project.query.filter_by(company_id=g.user.company_id).all()
-            for project in projects:
-                if project.is_user_allowed(g.user):
-                    accessible_project_ids.append(project.id)
-            
-            if accessible_project_ids:
-                query = query.filter(Task.project_id.in_(accessible_project_ids))
-            else:
-                # No accessible projects, return empty list
-                return jsonify({'success': True, 'tasks': []})
-        
-        tasks = query.order_by(Task.created_at.desc()).all()
-        
+        try:
+            query = _unified_tasks_query(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': f'Invalid filter: {e}'}), 400
+
+        # Only the columns the list shows, with project and sprint joined in
+        query = query.with_entities(
+            Task.id, Task.task_number, Task.name, Task.description, Task.status, Task.priority,
+            Task.estimated_hours, Task.project_id, Task.assigned_to_id, Task.created_by_id,
+            Task.start_date, Task.due_date, Task.completed_date, Task.created_at, Task.sprint_id,
+            Project.name.label('project_name'), Project.code.label('project_code'),
+            Project.team_id.label('project_team_id'),
+            Sprint.name.label('sprint_name'), Sprint.status.label('sprint_status'),
+            Sprint.start_date.label('sprint_start_date'), Sprint.end_date.label('sprint_end_date')
+        )
+        try:
+            rows, next_cursor = keyset_page(
+                query, Task.created_at, Task.id,
+                cursor=request.args.get('cursor'),
+                limit=parse_page_size(request.args.get('limit'))
+            )
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+
+        # Subtasks of the page's tasks in one query
+        subtasks_by_task = {}
+        subtask_rows = []
+        if rows:
+            subtask_rows = db.session.query(
+                SubTask.id, SubTask.task_id, SubTask.name, SubTask.status, SubTask.priority, SubTask.assigned_to_id
+            ).filter(
+                SubTask.task_id.in_([row.id for row in rows])
+            ).order_by(SubTask.id).all()
+        for subtask in subtask_rows:
+            subtasks_by_task.setdefault(subtask.task_id, []).append(subtask)
+
+        # Usernames of everyone assigned or creating, looked up once
+        user_ids = {row.assigned_to_id for row in rows} | {row.created_by_id for row in rows}
+        user_ids |= {subtask.assigned_to_id for subtask in subtask_rows}
+        user_ids.discard(None)
+        usernames = dict(db.session.query(User.id, User.username).filter(User.id.in_(user_ids)).all()) if user_ids else {}
+
+        today = datetime.now().date()
         task_list = []
-        for task in tasks:
+        for task in rows:
             # Determine if this is a team task
             is_team_task = (
-                g.user.team_id and 
-                task.project and 
-                task.project.team_id == g.user.team_id
+                g.user.team_id and
+                task.project_team_id == g.user.team_id
             )
-            
+            subtasks = subtasks_by_task.get(task.id, [])
+
             task_data = {
                 'id': task.id,
-                'task_number': getattr(task, 'task_number', f'TSK-{task.id:03d}'),  # Fallback for existing tasks
+                'task_number': task.task_number or f'TSK-{task.id:03d}',  # Fallback for existing tasks
                 'name': task.name,
                 'description': task.description,
                 'status': task.status.name,
                 'priority': task.priority.name,
                 'estimated_hours': task.estimated_hours,
                 'project_id': task.project_id,
-                'project_name': task.project.name if task.project else None,
-                'project_code': task.project.code if task.project else None,
+                'project_name': task.project_name,
+                'project_code': task.project_code,
                 'assigned_to_id': task.assigned_to_id,
-                'assigned_to_name': task.assigned_to.username if task.assigned_to else None,
+                'assigned_to_name': usernames.get(task.assigned_to_id),
                 'created_by_id': task.created_by_id,
-                'created_by_name': task.created_by.username if task.created_by else None,
+                'created_by_name': usernames.get(task.created_by_id),
                 'start_date': task.start_date.isoformat() if task.start_date else None,
                 'due_date': task.due_date.isoformat() if task.due_date else None,
                 'completed_date': task.completed_date.isoformat() if task.completed_date else None,
                 'created_at': task.created_at.isoformat(),
                 'is_team_task': is_team_task,
-                'subtask_count': len(task.subtasks) if task.subtasks else 0,
+                'subtask_count': len(subtasks),
                 'subtasks': [{
                     'id': subtask.id,
                     'name': subtask.name,
                     'status': subtask.status.name,
                     'priority': subtask.priority.name,
                     'assigned_to_id': subtask.assigned_to_id,
-                    'assigned_to_name': subtask.assigned_to.username if subtask.assigned_to else None
-                } for subtask in task.subtasks] if task.subtasks else [],
+                    'assigned_to_name': usernames.get(subtask.assigned_to_id)
+                } for subtask in subtasks],
                 'sprint_id': task.sprint_id,
-                'sprint_name': task.sprint.name if task.sprint else None,
-                'is_current_sprint': task.sprint.is_current if task.sprint else False
+                'sprint_name': task.sprint_name,
+                'is_current_sprint': Sprint.is_current_period(
+                    task.sprint_status, task.sprint_start_date, task.sprint_end_date, today
+                ) if task.sprint_name is not None else False
             }
             task_list.append(task_data)
         
-        return jsonify({'success': True, 'tasks': task_list})
+        return jsonify({
+            'success': True,
+            'tasks': task_list,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+            'server_time': server_time.isoformat()
+        })
         
     except Exception as e:
         logger.error(f"Error in get_unified_tasks: {str(e)}")
         return jsonify({'success': False, 'message': str(e)})
 
 
+@tasks_api_bp.route('/tasks/unified/counts')
+@role_required(Role.TEAM_MEMBER)
+@company_required
+def get_unified_task_counts():
+    """
+    Count all tasks matching the filters of /api/tasks/unified, not just a page.
+
+    Returns total, by_status (enum name -> count) and overdue: tasks past
+    their due date that are not done, cancelled or archived.
+    """
+    try:
+        try:
+            query = _unified_tasks_query(request.args).order_by(None)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': f'Invalid filter: {e}'}), 400
+
+        by_status = dict(query.with_entities(Task.status, func.count(Task.id)).group_by(Task.status).all())
+        overdue = query.filter(
+            Task.due_date < datetime.now().date(),
+            Task.status.notin_([TaskStatus.DONE, TaskStatus.CANCELLED, TaskStatus.ARCHIVED])
+        ).count()
+
+        return jsonify({
+            'success': True,
+            'total': sum(by_status.values()),
+            'by_status': {status.name: count for status, count in by_status.items()},
+            'overdue': overdue
+        })
+
+    except Exception as e:
+        logger.error(f"Error in get_unified_task_counts: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)})
+
+
 @tasks_api_bp.route('/tasks/<int:task_id>/status', methods=['PUT'])
 @role_required(Role.TEAM_MEMBER)
 @company_required
@@ -435,36 +589,14 @@ def add_task_dependency(task_id):
             return jsonify({'success': False, 'message': 'This dependency already exists'})
         
         # Check for circular dependencies
-        def would_create_cycle(blocked_id, blocking_id):
-            # Use a simple DFS to check if adding this dependency would create a cycle
-            visited = set()
-            
-            def dfs(current_blocked_id):
-                if current_blocked_id in visited:
-                    return False
-                visited.add(current_blocked_id)
-                
-                # If we reach the original blocking task, we have a cycle
-                if current_blocked_id == blocking_id:
-                    return True
-                
-                # Check all tasks that block the current task
-                dependencies = TaskDependency.query.filter_by(blocked_task_id=current_blocked_id).all()
-                for dep in dependencies:
-                    if dfs(dep.blocking_task_id):
-                        return True
-                
-                return False
-            
-            return dfs(blocked_id)
-        
         if would_create_cycle(blocked_task_id, blocking_task_id):
             return jsonify({'success': False, 'message': 'This dependency would create a circular dependency'})
         
         # Create the new dependency
         new_dependency = TaskDependency(
             blocked_task_id=blocked_task_id,
-            blocking_task_id=blocking_task_id
+            blocking_task_id=blocking_task_id,
+            created_by_id=g.user.id
         )
         
         db.session.add(new_dependency)
@@ -478,6 +610,87 @@ def add_task_dependency(task_id):
         return jsonify({'success': False, 'message': str(e)})
 
 
+@tasks_api_bp.route('/tasks/dependencies/bulk', methods=['POST'])
+@role_required(Role.TEAM_MEMBER)
+@company_required
+def add_task_dependencies_bulk():
+    """
+    Add many dependencies at once, e.g. when importing a plan.
+
+    Body: {"dependencies": [{"blocked": "TSK-002", "blocking": "TSK-001"}, ...]}
+    with task numbers. The dependencies are checked in order against the
+    company's dependency graph, loaded once, including the ones added before
+    them. Dependencies that already exist are skipped. If any is invalid,
+    none are added and the errors are returned with their index.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get('dependencies')
+        if not isinstance(items, list) or not items:
+            return jsonify({'success': False, 'message': 'A list of dependencies is required'}), 400
+        
+        pairs = []
+        for item in items:
+            if not isinstance(item, dict):
+                return jsonify({'success': False, 'message': 'Each dependency must be an object'}), 400
+            pairs.append((item.get('blocked'), item.get('blocking')))
+        
+        # Resolve all task numbers with one query
+        task_numbers = {number for pair in pairs for number in pair if number}
+        task_ids = dict(db.session.query(Task.task_number, Task.id).join(Project).filter(
+            Task.task_number.in_(task_numbers),
+            Project.company_id == g.user.company_id
+        ).all())
+        
+        graph = DependencyGraph.for_company(g.user.company_id)
+        errors = []
+        new_dependencies = []
+        skipped = 0
+        for index, (blocked_number, blocking_number) in enumerate(pairs):
+            if not blocked_number or not blocking_number:
+                errors.append({'index': index, 'message': 'Blocked and blocking task numbers are required'})
+                continue
+            missing = [number for number in (blocked_number, blocking_number) if number not in task_ids]
+            if missing:
+                errors.append({'index': index, 'message': f'Task {missing[0]} not found'})
+                continue
+            
+            blocked_task_id = task_ids[blocked_number]
+            blocking_task_id = task_ids[blocking_number]
+            if blocked_task_id == blocking_task_id:
+                errors.append({'index': index, 'message': 'A task cannot depend on itself'})
+            elif graph.has(blocked_task_id, blocking_task_id):
+                skipped += 1
+            elif graph.would_create_cycle(blocked_task_id, blocking_task_id):
+                errors.append({'index': index, 'message': 'This dependency would create a circular dependency'})
+            else:
+                graph.add(blocked_task_id, blocking_task_id)
+                new_dependencies.append({
+                    'blocked_task_id': blocked_task_id,
+                    'blocking_task_id': blocking_task_id,
+                    'created_by_id': g.user.id
+                })
+        
+        if errors:
+            return jsonify({'success': False, 'message': 'No dependencies were added', 'errors': errors}), 400
+        
+        if new_dependencies:
+            db.session.bulk_insert_mappings(TaskDependency, new_dependencies)
+            db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': f'{len(new_dependencies)} dependencies added',
+            'added': len(new_dependencies),
+            'skipped': skipped
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error adding task dependencies: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)})
+
+
 @tasks_api_bp.route('/tasks/<int:task_id>/dependencies/<int:dependency_task_id>', methods=['DELETE'])
 @role_required(Role.TEAM_MEMBER)
 @company_required
@@ -4,9 +4,10 @@ Handles all team-related API endpoints
 """
 
 from flask import Blueprint, jsonify, request, g
-from datetime import datetime, time, timedelta
+from datetime import datetime, timedelta
 from models import Team, User, TimeEntry, Role
 from routes.auth import login_required, role_required, company_required, system_admin_required
+from time_utils import date_range_filter
 
 teams_api_bp = Blueprint('teams_api', __name__, url_prefix='/api')
 
@@ -57,8 +58,7 @@ def team_hours_data():
         # Get time entries for this member in the date range
         entries = TimeEntry.query.filter(
             TimeEntry.user_id == member.id,
-            TimeEntry.arrival_time >= datetime.combine(start_date, time.min),
-            TimeEntry.arrival_time <= datetime.combine(end_date, time.max)
+            *date_range_filter(TimeEntry.arrival_time, start_date, end_date)
         ).order_by(TimeEntry.arrival_time).all()
 
         # Calculate daily and total hours
@@ -3,7 +3,7 @@ User management routes
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, g, session, abort
-from models import db, User, Role, Team, TimeEntry, WorkConfig, UserPreferences, Project, Task, SubTask, ProjectCategory, UserDashboard, Comment, Company
+from models import db, User, Role, Team, TimeEntry, DailyTimeRollup, WorkConfig, UserPreferences, Project, Task, SubTask, ProjectCategory, UserDashboard, Comment, Company
 from routes.auth import admin_required, company_required, login_required, system_admin_required
 from flask_mail import Message
 from flask import current_app
@@ -97,8 +97,8 @@ def create_user():
                     mail = Mail(current_app)
                     
                     # Get branding for email
-                    from models import BrandingSettings
-                    branding = BrandingSettings.get_settings()
+                    from utils.settings import get_branding
+                    branding = get_branding()
                     
                     msg = Message(
                         f'Welcome to {branding.app_name} - Verify Your Email',
@@ -253,6 +253,7 @@ def delete_user(user_id):
         
         # Delete user-specific records that can be safely removed
         TimeEntry.query.filter_by(user_id=user_id).delete()
+        DailyTimeRollup.query.filter_by(user_id=user_id).delete()
         WorkConfig.query.filter_by(user_id=user_id).delete()
         UserPreferences.query.filter_by(user_id=user_id).delete()
         
@@ -496,6 +497,7 @@ def system_admin_delete_user(user_id):
         # Otherwise proceed with normal deletion
         # Delete user-specific records
         TimeEntry.query.filter_by(user_id=user_id).delete()
+        DailyTimeRollup.query.filter_by(user_id=user_id).delete()
         WorkConfig.query.filter_by(user_id=user_id).delete()
         UserPreferences.query.filter_by(user_id=user_id).delete()
         UserDashboard.query.filter_by(user_id=user_id).delete()
@@ -3,10 +3,72 @@ Time utility functions for TimeTrack application.
 Includes time rounding functionality.
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 import math
 
 
+def to_storage_time(local_time, tz=None):
+    """
+    Convert a wall-clock time in a timezone to the time stored in the database.
+
+    Times are stored as naive server-local datetimes (datetime.now()).
+
+    Args:
+        local_time (datetime): Naive wall-clock time in tz
+        tz (tzinfo): Timezone of local_time, or None for server-local time
+
+    Returns:
+        datetime: Naive server-local datetime
+    """
+    if tz is None:
+        return local_time
+    return local_time.replace(tzinfo=tz).astimezone().replace(tzinfo=None)
+
+
+def day_bounds(start_date, end_date=None, tz=None):
+    """
+    Convert an inclusive date range into a half-open datetime range.
+
+    Args:
+        start_date (date): First day of the range
+        end_date (date): Last day of the range (defaults to start_date)
+        tz (tzinfo): Timezone the days start at midnight in, or None for
+            server-local days
+
+    Returns:
+        tuple: (start, end) datetimes where start <= t < end covers the days
+    """
+    if end_date is None:
+        end_date = start_date
+    return (to_storage_time(datetime.combine(start_date, time.min), tz),
+            to_storage_time(datetime.combine(end_date + timedelta(days=1), time.min), tz))
+
+
+def date_range_filter(column, start_date=None, end_date=None, tz=None):
+    """
+    Build filter conditions restricting a datetime column to whole days.
+
+    Unlike comparing func.date(column), the conditions compare the raw
+    column, so the database can use an index on it for a range scan.
+
+    Args:
+        column: The datetime column, e.g. TimeEntry.arrival_time
+        start_date (date): First day to include, or None for no lower bound
+        end_date (date): Last day to include, or None for no upper bound
+        tz (tzinfo): Timezone the days start at midnight in, or None for
+            server-local days
+
+    Returns:
+        list: Conditions to pass to query.filter(*conditions)
+    """
+    conditions = []
+    if start_date:
+        conditions.append(column >= to_storage_time(datetime.combine(start_date, time.min), tz))
+    if end_date:
+        conditions.append(column < to_storage_time(datetime.combine(end_date + timedelta(days=1), time.min), tz))
+    return conditions
+
+
 def round_time_to_interval(dt, interval_minutes, round_to_nearest=True):
     """
     Round a datetime to the specified interval.
@@ -87,8 +149,9 @@ def get_user_rounding_settings(user):
     # Handle both new UserPreferences model and old WorkConfig fallback
     try:
         # First try new UserPreferences model
-        from models import UserPreferences
-        preferences = UserPreferences.query.filter_by(user_id=user.id).first()
+        # Uses the relationship so preferences preloaded with the request
+        # identity are not queried again
+        preferences = getattr(user, 'preferences', None)
         if preferences:
             return preferences.time_rounding_minutes, preferences.round_to_nearest
         
@@ -290,8 +353,9 @@ def get_user_format_settings(user):
     # Handle both new UserPreferences model and old WorkConfig fallback
     try:
         # First try new UserPreferences model
-        from models import UserPreferences
-        preferences = UserPreferences.query.filter_by(user_id=user.id).first()
+        # Uses the relationship so preferences preloaded with the request
+        # identity are not queried again
+        preferences = getattr(user, 'preferences', None)
         if preferences:
             return preferences.date_format or 'ISO', preferences.time_format_24h
         
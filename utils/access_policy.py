@@ -0,0 +1,52 @@
+"""
+Project access policy as SQL filter clauses
+
+The rules of Project.is_user_allowed and Sprint.can_user_access expressed
+as SQLAlchemy conditions, so listing what a user may see is a single query
+filtered in the WHERE clause instead of loading every row of the company and
+checking it in Python. Keep both in sync when the rules change.
+
+    Project.query.filter(project_access_filter(user))
+    Task.query.join(Project).filter(project_access_filter(user))
+"""
+
+from sqlalchemy import and_, or_, select
+
+from models import Project, Role, Sprint
+
+# Roles that may access every project of their company
+COMPANY_WIDE_ROLES = (Role.ADMIN, Role.SUPERVISOR)
+
+
+def project_access_filter(user):
+    """Condition on Project matching Project.is_user_allowed(user)"""
+    conditions = [Project.company_id == user.company_id]
+    if user.role not in COMPANY_WIDE_ROLES:
+        # Team projects are restricted to the team, projects without a team are open
+        if user.team_id:
+            conditions.append(or_(Project.team_id.is_(None), Project.team_id == user.team_id))
+        else:
+            conditions.append(Project.team_id.is_(None))
+    return and_(*conditions)
+
+
+def accessible_project_ids(user):
+    """Subquery of the IDs of the projects a user may access, for IN clauses"""
+    return select(Project.id).where(project_access_filter(user)).scalar_subquery()
+
+
+def accessible_projects_query(user, active_only=True):
+    """Query of the projects a user may access"""
+    query = Project.query.filter(project_access_filter(user))
+    if active_only:
+        query = query.filter(Project.is_active == True)
+    return query
+
+
+def sprint_access_filter(user):
+    """Condition on Sprint matching Sprint.can_user_access(user)"""
+    # Company-wide sprints are open to everyone in the company
+    return and_(
+        Sprint.company_id == user.company_id,
+        or_(Sprint.project_id.is_(None), Sprint.project_id.in_(accessible_project_ids(user)))
+    )
@@ -0,0 +1,212 @@
+"""
+Time bucketing aggregations shared by dashboards and analytics
+
+time_bucket() truncates a datetime column to the start of its day, week
+(starting Monday) or month in SQL - date_trunc on PostgreSQL, date()
+modifiers on SQLite - so totals per period come from one GROUP BY query
+instead of one query per period.
+"""
+
+from datetime import date, timedelta
+
+from sqlalchemy import Date, func, literal
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from models import db, TimeEntry, DailyTimeRollup
+from utils.time_windows import TimeWindows
+
+
+class _TimeBucket(FunctionElement):
+    """Start date of the period a datetime falls into"""
+    type = Date()
+    inherit_cache = True
+    granularity = None
+
+
+class day_bucket(_TimeBucket):
+    name = 'day_bucket'
+    inherit_cache = True
+    granularity = 'day'
+
+
+class week_bucket(_TimeBucket):
+    name = 'week_bucket'
+    inherit_cache = True
+    granularity = 'week'
+
+
+class month_bucket(_TimeBucket):
+    name = 'month_bucket'
+    inherit_cache = True
+    granularity = 'month'
+
+
+def _bucket_arguments(element, compiler, **kw):
+    """Compiled column and, for shifted buckets, the shift as a '+N minutes' parameter"""
+    arguments = [compiler.process(clause, **kw) for clause in element.clauses]
+    return arguments[0], (arguments[1] if len(arguments) > 1 else None)
+
+
+@compiles(_TimeBucket)
+def _compile_time_bucket(element, compiler, **kw):
+    column, shift = _bucket_arguments(element, compiler, **kw)
+    if shift:
+        column = f"({column} + CAST({shift} AS INTERVAL))"
+    return f"CAST(date_trunc('{element.granularity}', {column}) AS DATE)"
+
+
+_SQLITE_MODIFIERS = {
+    'day': '',
+    # 'weekday 0' moves forward to Sunday, six days back is that week's Monday
+    'week': ", 'weekday 0', '-6 days'",
+    'month': ", 'start of month'",
+}
+
+
+@compiles(_TimeBucket, 'sqlite')
+def _compile_time_bucket_sqlite(element, compiler, **kw):
+    column, shift = _bucket_arguments(element, compiler, **kw)
+    if shift:
+        column = f"{column}, {shift}"
+    return f"date({column}{_SQLITE_MODIFIERS[element.granularity]})"
+
+
+GRANULARITIES = {
+    'day': day_bucket,
+    'week': week_bucket,
+    'month': month_bucket,
+}
+
+
+def time_bucket(column, granularity, offset=None):
+    """
+    SQL expression for the start date of the day, week or month of a datetime column
+
+    Args:
+        column: Datetime or date column
+        granularity: 'day', 'week' or 'month'
+        offset (timedelta): Shift applied before truncating, e.g.
+            TimeWindows.storage_offset to bucket by a user's local days
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    minutes = int(offset.total_seconds() // 60) if offset else 0
+    if minutes:
+        # A bound parameter, so compiled statements stay cacheable
+        return GRANULARITIES[granularity](column, literal(f'{minutes:+d} minutes'))
+    return GRANULARITIES[granularity](column)
+
+
+def bucket_start(day, granularity):
+    """Python equivalent of time_bucket() for a date"""
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def iter_buckets(start_date, end_date, granularity):
+    """Yield the start dates of all buckets between two dates (inclusive)"""
+    current = bucket_start(start_date, granularity)
+    while current <= end_date:
+        yield current
+        if granularity == 'day':
+            current += timedelta(days=1)
+        elif granularity == 'week':
+            current += timedelta(days=7)
+        else:
+            current = (current + timedelta(days=32)).replace(day=1)
+
+
+def _as_date(value):
+    # SQLite drivers may hand back the raw 'YYYY-MM-DD' string
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if hasattr(value, 'date'):
+        return value.date()
+    return value
+
+
+def get_time_buckets(user_id, start_date, end_date, granularity='day', completed_only=True, windows=None):
+    """
+    Sum a user's time entries per day, week or month with GROUP BY queries.
+
+    Completed entries of days before today are summed from the daily time
+    rollups, only today's (and later) entries are read from time_entry.
+    Rollups hold server-local days, so for users in another timezone all
+    entries are read from time_entry and bucketed by their local day.
+
+    Args:
+        user_id: ID of the user
+        start_date: First date to include
+        end_date: Last date to include
+        granularity: 'day', 'week' or 'month'
+        completed_only: Only count entries that have a departure time
+        windows: The user's TimeWindows (defaults to server-local days)
+
+    Returns:
+        dict: bucket start date -> {'seconds': summed duration, 'count': number
+        of entries}, in date order and including empty buckets
+    """
+    windows = windows or TimeWindows()
+    today = windows.today
+    rows = []
+    if completed_only and windows.is_server_local and start_date < today:
+        # Closed days are read from the daily rollups
+        rows += _rollup_bucket_rows(user_id, start_date, min(end_date, today - timedelta(days=1)), granularity)
+        start_date_raw = today
+    else:
+        start_date_raw = start_date
+
+    if start_date_raw <= end_date:
+        bucket = time_bucket(TimeEntry.arrival_time, granularity, windows.storage_offset).label('bucket')
+        query = db.session.query(
+            bucket,
+            func.sum(func.coalesce(TimeEntry.duration, 0)),
+            func.count(TimeEntry.id)
+        ).filter(
+            TimeEntry.user_id == user_id,
+            *windows.date_filter(TimeEntry.arrival_time, start_date_raw, end_date)
+        )
+        if completed_only:
+            query = query.filter(TimeEntry.departure_time.isnot(None))
+        rows += query.group_by(bucket).all()
+
+    buckets = {start: {'seconds': 0, 'count': 0}
+               for start in iter_buckets(start_date, end_date, granularity)}
+    first, last = bucket_start(start_date, granularity), bucket_start(end_date, granularity)
+    for start, seconds, count in rows:
+        # The shift is the current offset, a daylight saving change within
+        # the range may move entries at its edges just outside of it
+        start = min(max(_as_date(start), first), last)
+        totals = buckets[start]
+        totals['seconds'] += int(seconds or 0)
+        totals['count'] += int(count or 0)
+    return buckets
+
+
+def _rollup_bucket_rows(user_id, start_date, end_date, granularity):
+    bucket = time_bucket(DailyTimeRollup.date, granularity).label('bucket')
+    return db.session.query(
+        bucket,
+        func.sum(DailyTimeRollup.total_duration),
+        func.sum(DailyTimeRollup.entry_count)
+    ).filter(
+        DailyTimeRollup.user_id == user_id,
+        DailyTimeRollup.date >= start_date,
+        DailyTimeRollup.date <= end_date
+    ).group_by(bucket).all()
+
+
+def sum_buckets(buckets, start_date, end_date=None):
+    """Total seconds and entry count of the buckets starting within a date range"""
+    seconds = count = 0
+    for start, totals in buckets.items():
+        if start >= start_date and (end_date is None or start <= end_date):
+            seconds += totals['seconds']
+            count += totals['count']
+    return seconds, count
@@ -0,0 +1,143 @@
+"""
+Aggregation for the analytics graph and team views
+
+The database sums the durations of completed entries per day, project and
+user (GROUP BY), so only one row per combination is transferred instead of
+every entry. Closed days are read from the daily time rollups. Those rows
+are rolled up into weeks or months and per-project and per-user totals
+with pandas groupby.
+"""
+
+import pandas as pd
+from sqlalchemy import func
+
+from models import TimeEntry, DailyTimeRollup, Project, User
+from utils.analytics import time_bucket
+from utils.time_windows import TimeWindows
+
+# Analytics granularity parameter -> period of utils.analytics.time_bucket()
+GRANULARITY_PERIODS = {
+    'daily': 'day',
+    'weekly': 'week',
+    'monthly': 'month',
+}
+
+HOURS_COLUMNS = ['day', 'user_id', 'username', 'project_id', 'project_name', 'seconds']
+
+
+def get_period(granularity):
+    """Period for a granularity parameter, daily for unknown values"""
+    return GRANULARITY_PERIODS.get(granularity, 'day')
+
+
+def load_hours_frame(rows_query, rollup_query=None, windows=None):
+    """
+    Sum the completed entries of a filtered row query per day, user and project.
+
+    Days are always the grouping unit, even for weekly or monthly views, so
+    the number of days worked stays exact; rolling days up is cheap.
+
+    Args:
+        rows_query: Query built on routes.export_api.time_entry_rows_query()
+        rollup_query: The same filters on the daily time rollups
+            (routes.export_api.get_filtered_rollup_query()). When given,
+            days before today are summed from the rollups and only today's
+            entries from rows_query. Rollups hold server-local days, so they
+            are skipped for users in another timezone.
+        windows: The user's TimeWindows, entries are grouped by their local
+            day (defaults to server-local days)
+
+    Returns:
+        DataFrame: HOURS_COLUMNS plus hours, one row per day, user and project
+    """
+    windows = windows or TimeWindows()
+    day = time_bucket(TimeEntry.arrival_time, 'day', windows.storage_offset).label('day')
+    entries = rows_query.filter(
+        TimeEntry.departure_time.isnot(None),
+        TimeEntry.duration > 0
+    )
+    rows = []
+    if rollup_query is not None and windows.is_server_local:
+        entries = entries.filter(*windows.date_filter(TimeEntry.arrival_time, windows.today))
+        rows += _rollup_hours_rows(rollup_query, windows.today)
+
+    rows += entries.with_entities(
+        day, TimeEntry.user_id, User.username, TimeEntry.project_id, Project.name,
+        func.sum(TimeEntry.duration)
+    ).group_by(
+        day, TimeEntry.user_id, User.username, TimeEntry.project_id, Project.name
+    ).order_by(None).all()
+
+    frame = pd.DataFrame.from_records(rows, columns=HOURS_COLUMNS)
+    frame['day'] = pd.to_datetime(frame['day'])
+    frame['project_name'] = frame['project_name'].fillna('No Project')
+    frame['hours'] = frame['seconds'].astype(float) / 3600
+    return frame
+
+
+def _rollup_hours_rows(rollup_query, today):
+    """Rows of load_hours_frame() for the days before today, from the rollups"""
+    seconds = func.sum(DailyTimeRollup.total_duration)
+    return rollup_query.with_entities(
+        DailyTimeRollup.date, DailyTimeRollup.user_id, User.username,
+        DailyTimeRollup.project_id, Project.name, seconds
+    ).filter(
+        DailyTimeRollup.date < today
+    ).group_by(
+        DailyTimeRollup.date, DailyTimeRollup.user_id, User.username,
+        DailyTimeRollup.project_id, Project.name
+    ).having(seconds > 0).order_by(None).all()
+
+
+def bucket_starts(days, period):
+    """Start of the week (Monday) or month of each day"""
+    if period == 'week':
+        return days - pd.to_timedelta(days.dt.weekday, unit='D')
+    if period == 'month':
+        return days.dt.to_period('M').dt.start_time
+    return days
+
+
+def _date_keys(index):
+    return [timestamp.strftime('%Y-%m-%d') for timestamp in index]
+
+
+def graph_data(frame, granularity='daily'):
+    """Hours per period and per project for the graph view"""
+    period = get_period(granularity)
+    buckets = frame.assign(bucket=bucket_starts(frame['day'], period))
+
+    per_bucket = buckets.groupby('bucket')['hours'].sum().sort_index()
+    per_project = frame.groupby('project_name')['hours'].sum().sort_values(ascending=False)
+
+    return {
+        'timeSeries': [
+            {'date': date, 'hours': round(hours, 2)}
+            for date, hours in zip(_date_keys(per_bucket.index), per_bucket.tolist())
+        ],
+        'projectDistribution': [
+            {'project': project, 'hours': round(hours, 2)}
+            for project, hours in per_project.items()
+        ],
+        'totalHours': float(frame['hours'].sum()),
+        'totalDays': int(frame['day'].nunique())
+    }
+
+
+def team_data(frame, granularity='daily'):
+    """Hours per user and period for the team view"""
+    period = get_period(granularity)
+    buckets = frame.assign(bucket=bucket_starts(frame['day'], period))
+
+    per_user_bucket = buckets.groupby(['username', 'bucket'])['hours'].sum()
+    per_user = frame.groupby('username')['hours'].sum()
+
+    team = []
+    for username, total_hours in per_user.items():
+        user_buckets = per_user_bucket.loc[username]
+        team.append({
+            'username': username,
+            'daily_hours': dict(zip(_date_keys(user_buckets.index), user_buckets.tolist())),
+            'total_hours': round(total_hours, 2)
+        })
+    return {'team_data': team}
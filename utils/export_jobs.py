@@ -0,0 +1,197 @@
+"""
+Background export jobs
+
+Exports that may take longer than a request (all time, whole team) are
+recorded as ExportJob rows and produced by a thread pool in the worker
+process. The file is written to EXPORT_DIR, which has to be shared by all
+workers, and the row tracks the status, so any worker can answer status and
+download requests. Files are deleted once they expire.
+"""
+
+import logging
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from models import db, ExportJob
+from data_export import (
+    EXPORT_BATCH_SIZE, ANALYTICS_EXCEL_HEADER_FORMAT, analytics_export_table,
+    time_entry_export_table, write_csv, write_excel
+)
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('time_entries', 'analytics')
+FORMATS = {'csv': 'csv', 'excel': 'xlsx'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_export_dir():
+    export_dir = current_app.config['EXPORT_DIR']
+    os.makedirs(export_dir, exist_ok=True)
+    return export_dir
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config['EXPORT_JOB_WORKERS'],
+                thread_name_prefix='export-job'
+            )
+        return _executor
+
+
+def submit_export_job(user, kind, export_format, params):
+    """
+    Record an export job and start producing it in the background.
+
+    Args:
+        user: User requesting the export
+        kind: 'time_entries' or 'analytics'
+        export_format: 'csv' or 'excel'
+        params: JSON serializable export options
+
+    Returns:
+        ExportJob: The pending job
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown export kind: {kind}")
+    if export_format not in FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+
+    cleanup_expired_export_jobs()
+
+    job = ExportJob(user_id=user.id, company_id=user.company_id, kind=kind, export_format=export_format)
+    job.params_dict = params
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    _get_executor().submit(_run_in_app_context, app, job.id)
+    return job
+
+
+def _run_in_app_context(app, job_id):
+    with app.app_context():
+        run_export_job(job_id)
+
+
+def _counted(rows, counter):
+    for row in rows:
+        counter[0] += 1
+        yield row
+
+
+def _export_table(job):
+    """Header, rows, file name and Excel options of a job's export"""
+    params = job.params_dict
+    start_date = date.fromisoformat(params['start_date']) if params.get('start_date') else None
+    end_date = date.fromisoformat(params['end_date']) if params.get('end_date') else None
+
+    if job.kind == 'time_entries':
+        from routes.export import build_export_query
+        entries = build_export_query(job.user, start_date, end_date).yield_per(EXPORT_BATCH_SIZE)
+        header, rows = time_entry_export_table(entries)
+        filename = f"timetrack_export_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}"
+        return header, rows, filename, {'sheet_name': 'TimeTrack Data'}
+
+    from routes.export_api import get_filtered_analytics_query
+    view_type = params.get('view', 'table')
+    mode = params.get('mode', 'personal')
+    entries = get_filtered_analytics_query(
+        job.user, mode, start_date, end_date, params.get('project_id'), projection=True
+    ).yield_per(EXPORT_BATCH_SIZE)
+    header, rows = analytics_export_table(entries, view_type, mode)
+    filename = f"analytics_{view_type}_{mode}_{job.created_at.strftime('%Y%m%d_%H%M%S')}"
+    return header, rows, filename, {'sheet_name': 'Analytics Data',
+                                    'header_format': ANALYTICS_EXCEL_HEADER_FORMAT,
+                                    'max_column_width': 50}
+
+
+def run_export_job(job_id):
+    """Produce the file of a pending export job"""
+    job = ExportJob.query.get(job_id)
+    if job is None or job.status != ExportJob.PENDING:
+        return
+
+    job.status = ExportJob.RUNNING
+    job.started_at = datetime.now()
+    db.session.commit()
+
+    extension = FORMATS[job.export_format]
+    path = os.path.join(get_export_dir(), f"{job.id}-{secrets.token_hex(16)}.{extension}")
+    try:
+        header, rows, filename, excel_options = _export_table(job)
+        counter = [0]
+        if job.export_format == 'csv':
+            write_csv(header, _counted(rows, counter), path)
+        else:
+            write_excel(header, _counted(rows, counter), output=path, **excel_options)
+
+        job.status = ExportJob.COMPLETED
+        job.file_path = path
+        job.filename = f"{filename}.{extension}"
+        job.row_count = counter[0]
+    except Exception as e:
+        logger.exception(f"Export job {job_id} failed")
+        db.session.rollback()
+        if os.path.exists(path):
+            os.remove(path)
+        job = ExportJob.query.get(job_id)
+        job.status = ExportJob.FAILED
+        job.error = str(e)
+
+    job.completed_at = datetime.now()
+    job.expires_at = job.completed_at + timedelta(hours=current_app.config['EXPORT_JOB_TTL_HOURS'])
+    db.session.commit()
+
+
+def cleanup_expired_export_jobs(now=None):
+    """
+    Delete expired jobs with their files and fail jobs that never finished.
+
+    Returns:
+        int: Number of deleted jobs
+    """
+    now = now or datetime.now()
+
+    # Jobs whose worker process went away stay pending or running forever
+    stale_before = now - timedelta(minutes=current_app.config['EXPORT_JOB_TIMEOUT_MINUTES'])
+    ExportJob.query.filter(
+        ExportJob.status.in_([ExportJob.PENDING, ExportJob.RUNNING]),
+        ExportJob.created_at < stale_before
+    ).update({
+        'status': ExportJob.FAILED,
+        'error': 'The export did not finish in time',
+        'completed_at': now,
+        'expires_at': now + timedelta(hours=current_app.config['EXPORT_JOB_TTL_HOURS'])
+    }, synchronize_session=False)
+
+    expired = ExportJob.query.filter(ExportJob.expires_at < now).all()
+    for job in expired:
+        if job.file_path and os.path.exists(job.file_path):
+            try:
+                os.remove(job.file_path)
+            except OSError as e:
+                logger.warning(f"Could not delete export file {job.file_path}: {e}")
+        db.session.delete(job)
+    db.session.commit()
+    return len(expired)
+
+
+@click.command('cleanup-exports')
+@with_appcontext
+def cleanup_exports_command():
+    """Delete expired export files and jobs."""
+    deleted = cleanup_expired_export_jobs()
+    click.echo(f'Deleted {deleted} expired export job(s).')
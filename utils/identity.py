@@ -0,0 +1,127 @@
+"""
+Request identity loading with a short-lived process-local cache.
+
+The logged-in user, their company and their preferences are loaded with one
+joined query and cached as plain column snapshots. Cached snapshots are merged
+back into the current session without emitting a SELECT, so routes keep
+working with regular attached ORM instances.
+"""
+
+import copy
+import threading
+import time
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import db, User, Company, UserPreferences
+
+# Seconds a cached identity is served before it is reloaded. Changes made in
+# this process invalidate immediately; other workers pick them up after the TTL.
+DEFAULT_TTL = 15
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _snapshot(obj):
+    """Copy the loaded column values of an ORM instance into a dict"""
+    if obj is None:
+        return None
+    return {
+        attr.key: getattr(obj, attr.key)
+        for attr in inspect(obj).mapper.column_attrs
+    }
+
+
+def _restore(model, values):
+    """Attach a cached snapshot to the current session without a query"""
+    if values is None:
+        return None
+    obj = model(**copy.deepcopy(values))
+    make_transient_to_detached(obj)
+    return db.session.merge(obj, load=False)
+
+
+def _query_identity(user_id):
+    """Load user, company and preferences in a single round trip"""
+    return db.session.query(User, Company, UserPreferences).outerjoin(
+        Company, Company.id == User.company_id
+    ).outerjoin(
+        UserPreferences, UserPreferences.user_id == User.id
+    ).filter(User.id == user_id).first()
+
+
+def load_identity(user_id, ttl=DEFAULT_TTL):
+    """
+    Return (user, company) for the given user id.
+
+    The user's ``company`` and ``preferences`` relationships are populated so
+    that accessing them later in the request does not trigger lazy loads.
+    Returns (None, None) if the user does not exist.
+    """
+    now = time.monotonic()
+    entry = _cache.get(user_id) if ttl else None
+
+    if entry and entry['expires'] > now:
+        user = _restore(User, entry['user'])
+        company = _restore(Company, entry['company'])
+        preferences = _restore(UserPreferences, entry['preferences'])
+    else:
+        row = _query_identity(user_id)
+        if row is None:
+            _cache.pop(user_id, None)
+            return None, None
+        user, company, preferences = row
+        if ttl:
+            with _lock:
+                _cache[user_id] = {
+                    'user': _snapshot(user),
+                    'company': _snapshot(company),
+                    'preferences': _snapshot(preferences),
+                    'expires': now + ttl,
+                }
+
+    set_committed_value(user, 'company', company)
+    set_committed_value(user, 'preferences', preferences)
+    return user, company
+
+
+def invalidate_user(user_id):
+    """Drop the cached identity of a single user"""
+    with _lock:
+        _cache.pop(user_id, None)
+
+
+def invalidate_company(company_id):
+    """Drop the cached identities of all users of a company"""
+    with _lock:
+        for user_id in [uid for uid, entry in _cache.items()
+                        if entry['user'].get('company_id') == company_id]:
+            del _cache[user_id]
+
+
+def clear_identity_cache():
+    """Drop all cached identities"""
+    with _lock:
+        _cache.clear()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    invalidate_user(target.id)
+
+
+@event.listens_for(UserPreferences, 'after_insert')
+@event.listens_for(UserPreferences, 'after_update')
+@event.listens_for(UserPreferences, 'after_delete')
+def _preferences_changed(mapper, connection, target):
+    invalidate_user(target.user_id)
+
+
+@event.listens_for(Company, 'after_update')
+@event.listens_for(Company, 'after_delete')
+def _company_changed(mapper, connection, target):
+    invalidate_company(target.id)
@@ -0,0 +1,138 @@
+"""
+Index coverage report for the query patterns used in routes/
+
+Run with ``flask index-report``. For every query in INDEX_CATALOG it checks
+whether an index with matching leading columns exists and shows how the
+database plans the query, so sequential scans on large tables stand out.
+"""
+
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import inspect
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from models import (db, TimeEntry, Task, SubTask, TaskDependency, Note, SystemEvent,
+                    User, Project, Sprint)
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN wrapper around a select statement"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    return 'EXPLAIN ' + compiler.process(element.statement, **kw)
+
+
+@compiles(Explain, 'sqlite')
+def _compile_explain_sqlite(element, compiler, **kw):
+    return 'EXPLAIN QUERY PLAN ' + compiler.process(element.statement, **kw)
+
+
+def _recent():
+    return datetime.now() - timedelta(days=30)
+
+
+# (description, table, expected leading index columns, query factory)
+INDEX_CATALOG = [
+    ('Time entries of a user in a date range', 'time_entry', ['user_id', 'arrival_time'],
+     lambda: TimeEntry.query.filter(TimeEntry.user_id == 1, TimeEntry.arrival_time >= _recent())),
+    ('Time logged on a project', 'time_entry', ['project_id'],
+     lambda: TimeEntry.query.filter(TimeEntry.project_id == 1)),
+    ('Time logged on a task', 'time_entry', ['task_id'],
+     lambda: TimeEntry.query.filter(TimeEntry.task_id == 1)),
+    ('Tasks of a project', 'task', ['project_id'],
+     lambda: Task.query.filter(Task.project_id == 1)),
+    ('Tasks assigned to a user', 'task', ['assigned_to_id'],
+     lambda: Task.query.filter(Task.assigned_to_id == 1)),
+    ('Tasks of a sprint', 'task', ['sprint_id'],
+     lambda: Task.query.filter(Task.sprint_id == 1)),
+    ('Subtasks of a task', 'sub_task', ['task_id'],
+     lambda: SubTask.query.filter(SubTask.task_id == 1)),
+    ('Tasks blocked by a task', 'task_dependency', ['blocking_task_id'],
+     lambda: TaskDependency.query.filter(TaskDependency.blocking_task_id == 1)),
+    ('Notes of a company', 'note', ['company_id'],
+     lambda: Note.query.filter(Note.company_id == 1)),
+    ('Recent system events', 'system_event', ['timestamp'],
+     lambda: SystemEvent.query.filter(SystemEvent.timestamp >= _recent())),
+    ('Users of a company', 'user', ['company_id'],
+     lambda: User.query.filter(User.company_id == 1)),
+    ('Members of a team', 'user', ['team_id'],
+     lambda: User.query.filter(User.team_id == 1)),
+    ('Projects of a company', 'project', ['company_id'],
+     lambda: Project.query.filter(Project.company_id == 1)),
+    ('Sprints of a company', 'sprint', ['company_id'],
+     lambda: Sprint.query.filter(Sprint.company_id == 1)),
+]
+
+
+def get_indexed_column_lists(inspector, table):
+    """Get the column lists of all indexes, unique constraints and the primary key of a table"""
+    column_lists = [index['column_names'] for index in inspector.get_indexes(table)]
+    column_lists += [constraint['column_names'] for constraint in inspector.get_unique_constraints(table)]
+    primary_key = inspector.get_pk_constraint(table).get('constrained_columns')
+    if primary_key:
+        column_lists.append(primary_key)
+    return column_lists
+
+
+def is_covered(column_lists, columns):
+    """Check whether any index starts with the given columns"""
+    return any(list(indexed[:len(columns)]) == list(columns) for indexed in column_lists)
+
+
+def explain(query):
+    """Get the query plan of a query as a list of lines"""
+    rows = db.session.execute(Explain(query.statement)).fetchall()
+    # PostgreSQL returns one text column, SQLite (id, parent, notused, detail)
+    return [str(row[-1]) for row in rows]
+
+
+def build_index_report(with_plans=True):
+    """Check every catalog query for a usable index"""
+    inspector = inspect(db.engine)
+    report = []
+    for description, table, columns, make_query in INDEX_CATALOG:
+        entry = {
+            'description': description,
+            'table': table,
+            'columns': columns,
+            'covered': is_covered(get_indexed_column_lists(inspector, table), columns),
+            'plan': [],
+        }
+        if with_plans:
+            try:
+                entry['plan'] = explain(make_query())
+            except Exception as e:
+                db.session.rollback()
+                entry['plan'] = [f'EXPLAIN failed: {e}']
+        report.append(entry)
+    return report
+
+
+@click.command('index-report')
+@click.option('--plans/--no-plans', default=True, help='Show the query plan of every catalog query.')
+@with_appcontext
+def index_report_command(plans):
+    """Report missing indexes for common query patterns."""
+    report = build_index_report(with_plans=plans)
+    missing = 0
+    for entry in report:
+        status = 'ok' if entry['covered'] else 'MISSING'
+        if not entry['covered']:
+            missing += 1
+        click.echo(f"[{status:>7}] {entry['table']}({', '.join(entry['columns'])}) - {entry['description']}")
+        for line in entry['plan']:
+            click.echo(f'          {line}')
+
+    if missing:
+        click.echo(f'\n{missing} of {len(report)} query patterns have no supporting index.')
+    else:
+        click.echo(f'\nAll {len(report)} query patterns have a supporting index.')
@@ -0,0 +1,102 @@
+"""
+Keyset pagination
+
+Pages are read with WHERE (sort value, id) after the last row of the
+previous page instead of OFFSET, so every page costs the same no matter how
+deep the client has scrolled. The position is handed to the client as an
+opaque cursor string. Cursors record the sort key they were made for,
+so a cursor replayed with another sort is rejected instead of comparing
+values of a different column.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(value, row_id, key=None):
+    """Encode the sort value and id of the last row of a page, made for the sort key"""
+    if isinstance(value, datetime):
+        payload = {'t': 'datetime', 'v': value.isoformat()}
+    else:
+        payload = {'t': 'value', 'v': value}
+    payload['id'] = row_id
+    if key is not None:
+        payload['k'] = key
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor, key=None):
+    """
+    Decode a cursor from encode_cursor() made for the sort key.
+
+    Returns:
+        tuple: (sort value, id)
+
+    Raises:
+        ValueError: If the cursor is malformed or was made for another sort key
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if payload.get('k') != key:
+            raise ValueError(f"cursor was made for sort {payload.get('k')!r}")
+        value = payload['v']
+        if payload['t'] == 'datetime':
+            value = datetime.fromisoformat(value)
+        return value, int(payload['id'])
+    except (KeyError, TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def parse_page_size(limit, default=DEFAULT_PAGE_SIZE):
+    """Page size from a request parameter, clamped to 1..MAX_PAGE_SIZE"""
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def keyset_page(query, sort_column, id_column, descending=True, cursor=None, limit=DEFAULT_PAGE_SIZE, key=None):
+    """
+    Get one page of a query ordered by (sort_column, id_column).
+
+    Args:
+        query: Column query to page through, its rows need an id attribute
+        sort_column: Column or expression to sort by
+        id_column: Unique column breaking ties between equal sort values
+        descending: Sort direction
+        cursor: Cursor of the previous page, None for the first page
+        limit: Page size
+        key: Name of the sort, recorded in the cursors
+
+    Returns:
+        tuple: (rows with the sort value added as sort_key, cursor of the
+        next page or None on the last page)
+    """
+    query = query.add_columns(sort_column.label('sort_key'))
+    if cursor:
+        value, last_id = decode_cursor(cursor, key)
+        if descending:
+            query = query.filter(or_(sort_column < value, and_(sort_column == value, id_column < last_id)))
+        else:
+            query = query.filter(or_(sort_column > value, and_(sort_column == value, id_column > last_id)))
+
+    if descending:
+        query = query.order_by(None).order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(None).order_by(sort_column.asc(), id_column.asc())
+
+    # One extra row tells whether there is a next page
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.sort_key, last.id, key)
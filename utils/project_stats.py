@@ -0,0 +1,104 @@
+"""
+Task and time totals for many projects or sprints at once
+
+Project lists, the project progress widget and the sprint overview show
+counts per project or sprint. Loading them through relationships runs a
+query per row; these helpers return the totals of a whole list from one
+grouped query.
+"""
+
+from sqlalchemy import case, func
+
+from models import db, Project, Task, TaskStatus, TimeEntry
+
+
+def _task_count_columns():
+    return (
+        func.count(Task.id).label('total_tasks'),
+        func.sum(case((Task.status == TaskStatus.DONE, 1), else_=0)).label('completed_tasks'),
+        func.sum(case((Task.status == TaskStatus.IN_PROGRESS, 1), else_=0)).label('in_progress_tasks'),
+    )
+
+
+def _progress(completed, total):
+    return round(completed / total * 100, 1) if total else 0
+
+
+def get_project_progress(project_ids):
+    """
+    Get task counts and logged time of several projects with one query.
+
+    Args:
+        project_ids: IDs of the projects
+
+    Returns:
+        dict: project_id -> total_tasks, completed_tasks, in_progress_tasks,
+        progress (percentage of completed tasks), logged_seconds and
+        time_entry_count. Projects without tasks or entries get zeros.
+    """
+    project_ids = list(project_ids)
+    if not project_ids:
+        return {}
+
+    task_totals = db.session.query(
+        Task.project_id.label('project_id'), *_task_count_columns()
+    ).filter(Task.project_id.in_(project_ids)).group_by(Task.project_id).subquery()
+
+    time_totals = db.session.query(
+        TimeEntry.project_id.label('project_id'),
+        func.sum(func.coalesce(TimeEntry.duration, 0)).label('logged_seconds'),
+        func.count(TimeEntry.id).label('time_entry_count')
+    ).filter(TimeEntry.project_id.in_(project_ids)).group_by(TimeEntry.project_id).subquery()
+
+    rows = db.session.query(
+        Project.id,
+        task_totals.c.total_tasks, task_totals.c.completed_tasks, task_totals.c.in_progress_tasks,
+        time_totals.c.logged_seconds, time_totals.c.time_entry_count
+    ).outerjoin(
+        task_totals, task_totals.c.project_id == Project.id
+    ).outerjoin(
+        time_totals, time_totals.c.project_id == Project.id
+    ).filter(Project.id.in_(project_ids)).all()
+
+    progress = {}
+    for project_id, total, completed, in_progress, seconds, entry_count in rows:
+        total, completed = int(total or 0), int(completed or 0)
+        progress[project_id] = {
+            'total_tasks': total,
+            'completed_tasks': completed,
+            'in_progress_tasks': int(in_progress or 0),
+            'progress': _progress(completed, total),
+            'logged_seconds': int(seconds or 0),
+            'time_entry_count': int(entry_count or 0),
+        }
+    return progress
+
+
+def get_sprint_task_summaries(sprint_ids):
+    """
+    Get the task summary of several sprints with one grouped query.
+
+    Returns:
+        dict: sprint_id -> summary in the format of Sprint.get_task_summary()
+    """
+    sprint_ids = list(sprint_ids)
+    summaries = {sprint_id: {'total': 0, 'completed': 0, 'in_progress': 0,
+                             'not_started': 0, 'completion_percentage': 0}
+                 for sprint_id in sprint_ids}
+    if not sprint_ids:
+        return summaries
+
+    rows = db.session.query(Task.sprint_id, *_task_count_columns()).filter(
+        Task.sprint_id.in_(sprint_ids)
+    ).group_by(Task.sprint_id).all()
+
+    for sprint_id, total, completed, in_progress in rows:
+        total, completed, in_progress = int(total), int(completed or 0), int(in_progress or 0)
+        summaries[sprint_id] = {
+            'total': total,
+            'completed': completed,
+            'in_progress': in_progress,
+            'not_started': total - completed - in_progress,
+            'completion_percentage': int((completed / total) * 100) if total > 0 else 0
+        }
+    return summaries
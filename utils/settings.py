@@ -2,10 +2,137 @@
 System settings utility functions
 """
 
-from models import SystemSettings
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from models import SystemSettings, BrandingSettings
+
+logger = logging.getLogger(__name__)
+
+
+class SettingsCache:
+    """
+    In-memory copy of all SystemSettings and the BrandingSettings row.
+
+    Every worker process keeps its own copy. Saving a setting replaces a small
+    marker file, and each worker reloads once it notices the marker changed,
+    so a change made in one gunicorn worker reaches all of them on their next
+    request. MAX_AGE bounds staleness for changes made outside the app.
+    """
+
+    MAX_AGE = 300
+
+    def __init__(self, marker_path):
+        self.marker_path = marker_path
+        self._lock = threading.Lock()
+        self._version = None
+        self._loaded_at = 0
+        self._settings = None
+        self._branding = None
+
+    def _marker_version(self):
+        try:
+            stat = os.stat(self.marker_path)
+        except OSError:
+            return None
+        # The marker is replaced on every change, so the inode changes even
+        # when two saves land within the filesystem's mtime resolution
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _ensure_loaded(self):
+        version = self._marker_version()
+        if (self._settings is not None and version == self._version
+                and time.monotonic() - self._loaded_at < self.MAX_AGE):
+            return
+
+        with self._lock:
+            settings = SystemSettings.get_all()
+            branding = BrandingSettings.get_settings()
+            # getattr() refreshes attributes expired by the commit in
+            # get_settings() when it had to create the default row
+            self._branding = {
+                attr.key: getattr(branding, attr.key)
+                for attr in inspect(BrandingSettings).column_attrs
+            }
+            self._settings = settings
+            # Remember the version seen *before* loading, so a change committed
+            # while we were loading triggers another reload
+            self._version = version
+            self._loaded_at = time.monotonic()
+
+    def get(self, key, default=None):
+        """Get a setting value from the cache"""
+        self._ensure_loaded()
+        return self._settings.get(key, default)
+
+    def get_branding(self):
+        """Get a detached BrandingSettings instance built from the cache"""
+        self._ensure_loaded()
+        branding = BrandingSettings(**self._branding)
+        make_transient_to_detached(branding)
+        return branding
+
+    def invalidate(self):
+        """Reload the local copy on next use and notify other workers through the marker file"""
+        # Readers in other threads keep using the old copy until the reload
+        # replaces it, so it is never set to None under them
+        self._loaded_at = float('-inf')
+        try:
+            directory = os.path.dirname(self.marker_path) or '.'
+            fd, tmp_path = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, 'w') as f:
+                f.write(str(time.time()))
+            os.replace(tmp_path, self.marker_path)
+        except OSError as e:
+            logger.error(f"Failed to update settings version marker: {e}")
+
+
+settings_cache = SettingsCache(os.environ.get(
+    'SETTINGS_VERSION_FILE',
+    os.path.join(tempfile.gettempdir(), 'timetrack-settings.version')
+))
 
 
 def get_system_setting(key, default='false'):
     """Helper function to get system setting value"""
-    setting = SystemSettings.query.filter_by(key=key).first()
-    return setting.value if setting else default
\ No newline at end of file
+    return settings_cache.get(key, default)
+
+
+def get_branding():
+    """Helper function to get the current branding settings for display"""
+    return settings_cache.get_branding()
+
+
+def invalidate_settings_cache():
+    """Force all workers to reload settings on their next request"""
+    settings_cache.invalidate()
+
+
+@event.listens_for(SystemSettings, 'after_insert')
+@event.listens_for(SystemSettings, 'after_update')
+@event.listens_for(SystemSettings, 'after_delete')
+@event.listens_for(BrandingSettings, 'after_insert')
+@event.listens_for(BrandingSettings, 'after_update')
+@event.listens_for(BrandingSettings, 'after_delete')
+def _settings_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info['settings_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    # Only notify once the change is visible to other connections
+    if session.info.pop('settings_changed', False):
+        invalidate_settings_cache()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('settings_changed', None)
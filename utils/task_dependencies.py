@@ -0,0 +1,254 @@
+"""
+Task dependency graph checks
+
+A dependency makes its blocked task wait for its blocking task, so the
+dependencies have to stay acyclic. would_create_cycle() answers for one new
+dependency with a single recursive query; DependencyGraph loads the
+dependencies of a whole company once and checks many new ones in memory,
+for bulk imports of plans with long dependency chains.
+
+get_project_dependency_graph() orders the tasks of a project by their
+dependencies and finds the critical path by estimated hours. Results are
+cached per process and reused while a cheap version query over the
+project's tasks and dependencies returns the same stamp, so they stay
+correct across workers and after bulk inserts that skip ORM events.
+"""
+
+import threading
+from collections import defaultdict, deque
+
+from sqlalchemy import exists, func, select
+
+from models import db, Project, Task, TaskDependency
+
+
+def would_create_cycle(blocked_task_id, blocking_task_id):
+    """
+    Check if a new dependency would close a cycle.
+
+    It does when the blocking task already waits for the blocked task,
+    directly or through other tasks. The tasks the blocking task waits for
+    are collected in one WITH RECURSIVE query; UNION drops the tasks already
+    reached, so the recursion also ends on cycles already in the data.
+    """
+    waits_for = select(TaskDependency.blocking_task_id.label('task_id')).where(
+        TaskDependency.blocked_task_id == blocking_task_id
+    ).cte('waits_for', recursive=True)
+    waits_for = waits_for.union(
+        select(TaskDependency.blocking_task_id).join(
+            waits_for, TaskDependency.blocked_task_id == waits_for.c.task_id
+        )
+    )
+    return db.session.query(exists().where(waits_for.c.task_id == blocked_task_id)).scalar()
+
+
+class DependencyGraph:
+    """The dependencies between the tasks of a company, held in memory"""
+
+    def __init__(self, edges=()):
+        """
+        Args:
+            edges: (blocked_task_id, blocking_task_id) pairs
+        """
+        self.blocking = defaultdict(set)
+        for blocked_id, blocking_id in edges:
+            self.blocking[blocked_id].add(blocking_id)
+
+    @classmethod
+    def for_company(cls, company_id):
+        """Load the dependencies between the tasks of a company with one query"""
+        edges = db.session.query(
+            TaskDependency.blocked_task_id, TaskDependency.blocking_task_id
+        ).join(Task, Task.id == TaskDependency.blocked_task_id
+        ).join(Project, Task.project_id == Project.id
+        ).filter(Project.company_id == company_id).all()
+        return cls(edges)
+
+    def has(self, blocked_task_id, blocking_task_id):
+        return blocking_task_id in self.blocking.get(blocked_task_id, ())
+
+    def waits_for(self, task_id, other_task_id):
+        """Whether a task waits for another one, directly or through other tasks"""
+        visited = set()
+        stack = [task_id]
+        while stack:
+            current = stack.pop()
+            for blocking_id in self.blocking.get(current, ()):
+                if blocking_id == other_task_id:
+                    return True
+                if blocking_id not in visited:
+                    visited.add(blocking_id)
+                    stack.append(blocking_id)
+        return False
+
+    def would_create_cycle(self, blocked_task_id, blocking_task_id):
+        return blocked_task_id == blocking_task_id or self.waits_for(blocking_task_id, blocked_task_id)
+
+    def add(self, blocked_task_id, blocking_task_id):
+        self.blocking[blocked_task_id].add(blocking_task_id)
+
+
+_graph_cache = {}
+_graph_cache_lock = threading.Lock()
+MAX_CACHED_GRAPHS = 500
+
+
+def _project_task_ids(project_id):
+    return select(Task.id).where(Task.project_id == project_id)
+
+
+def _project_dependencies_filter(project_id):
+    # Only dependencies between two tasks of the project are part of its graph
+    return (
+        TaskDependency.blocked_task_id.in_(_project_task_ids(project_id)),
+        TaskDependency.blocking_task_id.in_(_project_task_ids(project_id)),
+    )
+
+
+def _graph_version(project_id):
+    """
+    Stamp that changes whenever a task or dependency of a project does.
+
+    Task.updated_at moves on every task update, including estimates, and
+    dependency IDs only grow, so a dependency replaced by another one
+    changes the maximum ID even though the count stays the same.
+    """
+    tasks = select(Task.id, Task.updated_at).where(Task.project_id == project_id).subquery()
+    dependencies = select(TaskDependency.id).where(*_project_dependencies_filter(project_id)).subquery()
+    return tuple(db.session.query(
+        select(func.count(tasks.c.id)).scalar_subquery(),
+        select(func.max(tasks.c.updated_at)).scalar_subquery(),
+        select(func.count(dependencies.c.id)).scalar_subquery(),
+        select(func.max(dependencies.c.id)).scalar_subquery(),
+    ).one())
+
+
+def compute_dependency_schedule(task_ids, hours, edges):
+    """
+    Topological order, earliest starts and critical path of a dependency graph.
+
+    Kahn's algorithm orders the tasks and the earliest starts follow in the
+    same pass, so the whole computation is linear in tasks plus dependencies.
+
+    Args:
+        task_ids: IDs of the tasks, in the order ties are broken in
+        hours: task_id -> estimated hours (None counts as 0)
+        edges: (blocked_task_id, blocking_task_id) pairs
+
+    Returns:
+        dict: order (task IDs, every task after the tasks blocking it),
+        earliest_start and earliest_finish (task_id -> hours from the start),
+        critical_path (task IDs of the longest chain by estimated hours),
+        total_hours (its length) and cyclic_task_ids (tasks on or behind
+        a dependency cycle, left out of everything else)
+    """
+    blocks = defaultdict(list)
+    waiting_on = {task_id: 0 for task_id in task_ids}
+    for blocked_id, blocking_id in edges:
+        blocks[blocking_id].append(blocked_id)
+        waiting_on[blocked_id] += 1
+
+    earliest_start = {task_id: 0.0 for task_id in task_ids}
+    earliest_finish = {}
+    # The blocking task each task's earliest start comes from
+    critical_blocker = {}
+    order = []
+    ready = deque(task_id for task_id in task_ids if waiting_on[task_id] == 0)
+    while ready:
+        task_id = ready.popleft()
+        order.append(task_id)
+        finish = earliest_start[task_id] + (hours.get(task_id) or 0)
+        earliest_finish[task_id] = finish
+        for blocked_id in blocks[task_id]:
+            if blocked_id not in critical_blocker or finish > earliest_start[blocked_id]:
+                earliest_start[blocked_id] = finish
+                critical_blocker[blocked_id] = task_id
+            waiting_on[blocked_id] -= 1
+            if waiting_on[blocked_id] == 0:
+                ready.append(blocked_id)
+
+    critical_path = []
+    total_hours = 0.0
+    if order:
+        # Walk back from the task finishing last along the blockers that set each start
+        task_id = max(order, key=lambda t: earliest_finish[t])
+        total_hours = earliest_finish[task_id]
+        while task_id is not None:
+            critical_path.append(task_id)
+            task_id = critical_blocker.get(task_id)
+        critical_path.reverse()
+
+    scheduled = set(order)
+    return {
+        'order': order,
+        'earliest_start': {task_id: earliest_start[task_id] for task_id in order},
+        'earliest_finish': earliest_finish,
+        'critical_path': critical_path,
+        'total_hours': total_hours,
+        'cyclic_task_ids': [task_id for task_id in task_ids if task_id not in scheduled],
+    }
+
+
+def _build_project_dependency_graph(project_id):
+    tasks = db.session.query(
+        Task.id, Task.task_number, Task.name, Task.status, Task.estimated_hours
+    ).filter(Task.project_id == project_id).order_by(Task.id).all()
+    edges = db.session.query(
+        TaskDependency.blocked_task_id, TaskDependency.blocking_task_id
+    ).filter(*_project_dependencies_filter(project_id)).all()
+
+    schedule = compute_dependency_schedule(
+        [task.id for task in tasks], {task.id: task.estimated_hours for task in tasks}, edges
+    )
+
+    blocked_by = defaultdict(list)
+    for blocked_id, blocking_id in edges:
+        blocked_by[blocked_id].append(blocking_id)
+
+    critical = set(schedule['critical_path'])
+    tasks_by_id = {task.id: task for task in tasks}
+    task_list = []
+    for task_id in schedule['order'] + schedule['cyclic_task_ids']:
+        task = tasks_by_id[task_id]
+        task_list.append({
+            'id': task.id,
+            'task_number': task.task_number,
+            'name': task.name,
+            'status': task.status.name if task.status else None,
+            'estimated_hours': task.estimated_hours,
+            'blocked_by': sorted(blocked_by[task_id]),
+            'earliest_start': schedule['earliest_start'].get(task_id),
+            'earliest_finish': schedule['earliest_finish'].get(task_id),
+            'is_critical': task_id in critical,
+        })
+
+    return {
+        'tasks': task_list,
+        'topological_order': schedule['order'],
+        'critical_path': schedule['critical_path'],
+        'critical_path_hours': schedule['total_hours'],
+        'cyclic_task_ids': schedule['cyclic_task_ids'],
+    }
+
+
+def get_project_dependency_graph(project_id):
+    """
+    Get the dependency graph of a project with its schedule.
+
+    Returns:
+        dict: tasks (in topological order, with blocked_by, earliest_start,
+        earliest_finish and is_critical), topological_order, critical_path,
+        critical_path_hours and cyclic_task_ids. Hours count from the start
+        of the project. Tasks on a dependency cycle come last, unscheduled.
+    """
+    version = _graph_version(project_id)
+    cached = _graph_cache.get(project_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    graph = _build_project_dependency_graph(project_id)
+    with _graph_cache_lock:
+        if len(_graph_cache) >= MAX_CACHED_GRAPHS:
+            _graph_cache.clear()
+        _graph_cache[project_id] = (version, graph)
+    return graph
@@ -0,0 +1,151 @@
+"""
+Daily time rollups
+
+DailyTimeRollup rows hold the sums of the completed time entries of each
+user, project and task per day. Whenever a time entry is inserted, updated
+or deleted, the rows of the day(s) it belonged to are recomputed from
+time_entry in the same transaction, so the rollups are as current as the
+entries themselves. Rows are upserted on the unique rollup key, so two
+transactions refreshing the same day cannot leave duplicate rows. Aggregates over closed days read the rollups and only
+today's entries, which may still change, are read raw.
+
+Bulk query deletes bypass the ORM events and have to delete the matching
+rollups themselves. `flask rebuild-time-rollups` recomputes every row.
+"""
+
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import Date, and_, event, exists, func, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm.attributes import get_history
+
+from models import db, TimeEntry, DailyTimeRollup
+from models.time_rollup import ROLLUP_KEY_EXPRESSIONS
+from time_utils import date_range_filter
+from utils.analytics import time_bucket
+
+# Time entry attributes a rollup row depends on
+KEY_ATTRIBUTES = ('user_id', 'project_id', 'task_id', 'arrival_time')
+SUM_ATTRIBUTES = ('departure_time', 'duration', 'total_break_duration')
+
+ROLLUP_COLUMNS = ['user_id', 'project_id', 'task_id', 'date',
+                  'total_duration', 'total_break_duration', 'entry_count', 'updated_at']
+SUM_COLUMNS = ROLLUP_COLUMNS[4:]
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def _matches(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def _rollup_sums():
+    return [
+        func.coalesce(func.sum(TimeEntry.duration), 0),
+        func.coalesce(func.sum(TimeEntry.total_break_duration), 0),
+        func.count(TimeEntry.id),
+        literal(datetime.now())
+    ]
+
+
+def refresh_rollup(connection, user_id, project_id, task_id, day):
+    """Recompute the rollup row of one user, project, task and day from time_entry"""
+    rollup = DailyTimeRollup.__table__
+    key = and_(
+        _matches(rollup.c.user_id, user_id),
+        _matches(rollup.c.project_id, project_id),
+        _matches(rollup.c.task_id, task_id),
+        rollup.c.date == day
+    )
+    entries = and_(
+        _matches(TimeEntry.user_id, user_id),
+        _matches(TimeEntry.project_id, project_id),
+        _matches(TimeEntry.task_id, task_id),
+        TimeEntry.departure_time.isnot(None),
+        *date_range_filter(TimeEntry.arrival_time, day, day)
+    )
+
+    # No row is selected, and so written, when the day has no completed entries left
+    sums = select(
+        TimeEntry.user_id, TimeEntry.project_id, TimeEntry.task_id, literal(day, Date),
+        *_rollup_sums()
+    ).where(entries).group_by(TimeEntry.user_id, TimeEntry.project_id, TimeEntry.task_id)
+
+    insert = UPSERT_INSERTS.get(connection.dialect.name)
+    if insert is None:
+        connection.execute(rollup.delete().where(key))
+        connection.execute(rollup.insert().from_select(ROLLUP_COLUMNS, sums))
+        return
+
+    upsert = insert(rollup).from_select(ROLLUP_COLUMNS, sums)
+    connection.execute(upsert.on_conflict_do_update(
+        index_elements=ROLLUP_KEY_EXPRESSIONS,
+        set_={name: upsert.excluded[name] for name in SUM_COLUMNS}
+    ))
+    connection.execute(rollup.delete().where(key, ~exists().where(entries)))
+
+
+def _rollup_key(target, previous=False):
+    values = []
+    for name in KEY_ATTRIBUTES:
+        value = getattr(target, name)
+        if previous:
+            history = get_history(target, name)
+            if history.deleted:
+                value = history.deleted[0]
+        values.append(value)
+    user_id, project_id, task_id, arrival_time = values
+    return user_id, project_id, task_id, arrival_time.date()
+
+
+@event.listens_for(TimeEntry, 'after_insert')
+@event.listens_for(TimeEntry, 'after_delete')
+def _time_entry_written(mapper, connection, target):
+    if target.departure_time is not None:
+        refresh_rollup(connection, *_rollup_key(target))
+
+
+@event.listens_for(TimeEntry, 'after_update')
+def _time_entry_updated(mapper, connection, target):
+    # Pausing and note edits leave the sums alone
+    if not any(get_history(target, name).has_changes() for name in KEY_ATTRIBUTES + SUM_ATTRIBUTES):
+        return
+
+    # An entry moved to another day, project or task leaves its old row too
+    for key in {_rollup_key(target, previous=True), _rollup_key(target)}:
+        refresh_rollup(connection, *key)
+
+
+def rebuild_time_rollups():
+    """
+    Recompute all rollup rows from time_entry.
+
+    Returns:
+        int: Number of rollup rows
+    """
+    day = time_bucket(TimeEntry.arrival_time, 'day')
+    rows = select(
+        TimeEntry.user_id, TimeEntry.project_id, TimeEntry.task_id, day, *_rollup_sums()
+    ).where(
+        TimeEntry.departure_time.isnot(None)
+    ).group_by(TimeEntry.user_id, TimeEntry.project_id, TimeEntry.task_id, day)
+
+    rollup = DailyTimeRollup.__table__
+    db.session.execute(rollup.delete())
+    db.session.execute(rollup.insert().from_select(ROLLUP_COLUMNS, rows))
+    db.session.commit()
+    return DailyTimeRollup.query.count()
+
+
+@click.command('rebuild-time-rollups')
+@with_appcontext
+def rebuild_time_rollups_command():
+    """Recompute the daily time rollups from all time entries."""
+    count = rebuild_time_rollups()
+    click.echo(f'Rebuilt {count} daily time rollup row(s).')
@@ -0,0 +1,73 @@
+"""
+Time tracking statistics shared by the home and time tracking views
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, func
+
+from models import db, TimeEntry
+from utils.time_windows import TimeWindows
+
+
+def get_user_time_stats(user_id, today=None, completed_only=False, include_active_projects=True, windows=None):
+    """
+    Compute today/week/month totals for a user with a single aggregate query.
+
+    Args:
+        user_id: ID of the user
+        today: Reference date (defaults to the current date)
+        completed_only: Only count entries that have a departure time
+        include_active_projects: Also look up the recently active projects
+        windows: The user's TimeWindows (defaults to server-local days)
+
+    Returns:
+        dict: today_hours, week_hours, month_hours (summed durations in
+        seconds), today_count, week_count, month_count (number of entries)
+        and active_project_ids (projects with entries in the last 30 days)
+    """
+    windows = windows or TimeWindows()
+    if today is None:
+        today = windows.today
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+
+    arrival = TimeEntry.arrival_time
+    periods = {
+        'today': and_(*windows.date_filter(arrival, today, today)),
+        'week': and_(*windows.date_filter(arrival, week_start)),
+        'month': and_(*windows.date_filter(arrival, month_start)),
+    }
+
+    columns = []
+    for condition in periods.values():
+        columns.append(func.sum(case((condition, func.coalesce(TimeEntry.duration, 0)), else_=0)))
+        columns.append(func.sum(case((condition, 1), else_=0)))
+
+    # The week may start in the previous month, so scan from whichever is earlier
+    query = db.session.query(*columns).filter(
+        TimeEntry.user_id == user_id,
+        *windows.date_filter(arrival, min(week_start, month_start))
+    )
+    if completed_only:
+        query = query.filter(TimeEntry.departure_time.isnot(None))
+    row = query.one()
+
+    stats = {}
+    for index, name in enumerate(periods):
+        stats[f'{name}_hours'] = int(row[index * 2] or 0)
+        stats[f'{name}_count'] = int(row[index * 2 + 1] or 0)
+
+    if include_active_projects:
+        stats['active_project_ids'] = get_active_project_ids(user_id)
+    return stats
+
+
+def get_active_project_ids(user_id, days=30):
+    """Get the IDs of projects the user logged time on in the last N days"""
+    rows = db.session.query(TimeEntry.project_id).filter(
+        TimeEntry.user_id == user_id,
+        TimeEntry.project_id.isnot(None),
+        TimeEntry.arrival_time >= datetime.now() - timedelta(days=days)
+    ).distinct().all()
+    return {project_id for project_id, in rows}
@@ -0,0 +1,122 @@
+"""
+Per-user day, week and month boundaries
+
+Time entries are stored as naive server-local datetimes, but a user's
+"today" starts at midnight in the timezone of their preferences. TimeWindows
+holds those boundaries for one user at one moment and converts date ranges
+into the stored server-local ranges, so queries keep comparing the raw,
+indexed columns. get_time_windows() computes them once per request.
+
+Aggregates cached across requests key on TimeWindows.key, so results are
+only shared between users whose days start and end at the same moment.
+
+The daily time rollups hold server-local days and are only read for users
+whose days are the server's days (TimeWindows.is_server_local). Preferences
+default to 'UTC', so on a server that does not run in UTC, users who never
+picked a timezone read raw entries. Running the server in UTC, or users
+picking the server's timezone, keeps them on the rollups.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from flask import g, has_request_context
+
+from time_utils import day_bounds, date_range_filter
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _zone(name):
+    return ZoneInfo(name)
+
+
+def get_user_timezone(user):
+    """
+    Timezone of a user's preferences.
+
+    Returns:
+        tzinfo: The timezone, or None for server-local time when the user
+        has no preference or an unknown one
+    """
+    preferences = getattr(user, 'preferences', None) if user else None
+    name = preferences.timezone if preferences else None
+    if not name:
+        return None
+    try:
+        return _zone(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown timezone {name!r} in the preferences of user {user.id}")
+        return None
+
+
+class TimeWindows:
+    """Day, week and month boundaries of a timezone at one moment"""
+
+    def __init__(self, tz=None, now=None):
+        """
+        Args:
+            tz: Timezone the user's days start in, None for server-local time
+            now: Current server-local time (defaults to datetime.now())
+        """
+        self.tz = tz
+        self.now = now or datetime.now()
+        # Naive datetimes are taken as server-local by astimezone()
+        self.local_now = self.now.astimezone(tz).replace(tzinfo=None) if tz else self.now
+        self.today = self.local_now.date()
+        self.week_start = self.today - timedelta(days=self.today.weekday())
+        self.month_start = self.today.replace(day=1)
+
+    @property
+    def storage_offset(self):
+        """How far the user's wall clock is ahead of the server's right now"""
+        return self.local_now - self.now
+
+    @property
+    def is_server_local(self):
+        """
+        Whether the user's days are the server's days, e.g. in the daily rollups.
+
+        The user's timezone has to have the server's UTC offset now and in
+        winter and summer too, or days across a DST change would not match.
+        """
+        if self.tz is None:
+            return True
+        for moment in (self.now, self.now.replace(month=1, day=1), self.now.replace(month=7, day=1)):
+            if moment.astimezone(self.tz).replace(tzinfo=None) != moment:
+                return False
+        return True
+
+    @property
+    def key(self):
+        """Cache key part identifying the user's current day"""
+        return (int(self.storage_offset.total_seconds()), self.today.isoformat())
+
+    def local_date(self, stored_time):
+        """The user's date of a stored server-local datetime"""
+        if self.tz is None:
+            return stored_time.date()
+        return stored_time.astimezone(self.tz).date()
+
+    def bounds(self, start_date, end_date=None):
+        """Stored (start, end) datetimes covering the user's days"""
+        return day_bounds(start_date, end_date, self.tz)
+
+    def date_filter(self, column, start_date=None, end_date=None):
+        """Filter conditions restricting a stored datetime column to the user's days"""
+        return date_range_filter(column, start_date, end_date, self.tz)
+
+
+def get_time_windows(user):
+    """TimeWindows of a user, computed once per request"""
+    if not has_request_context():
+        return TimeWindows(get_user_timezone(user))
+
+    windows = g.setdefault('_time_windows', {})
+    user_id = user.id if user else None
+    if user_id not in windows:
+        windows[user_id] = TimeWindows(get_user_timezone(user))
+    return windows[user_id]
@@ -0,0 +1,340 @@
+"""
+Dashboard widget data
+
+Every widget type has a provider registered with @widget_provider. A provider
+declares which inputs its result depends on (the user, their team, company,
+role or current local day, plus the widget config), which together with a time bucket derived
+from DashboardWidget.refresh_interval forms its cache key. Results are cached
+per process, so auto-refresh polling from several tabs - or from users that
+share the same inputs - is served without recomputing.
+
+Providers compute against a WidgetDataContext, which memoizes the sub-results
+several widgets share (daily time totals, accessible projects).
+"""
+
+import json
+import threading
+import time
+from datetime import timedelta
+
+from sqlalchemy import event
+
+from models import db, TimeEntry, Project, Task, Role, TaskStatus, WidgetType
+from utils.analytics import get_time_buckets, sum_buckets
+from utils.project_stats import get_project_progress
+from utils.time_windows import TimeWindows, get_time_windows, get_user_timezone
+
+DEFAULT_REFRESH_INTERVAL = 60
+
+
+class WidgetDataContext:
+    """Per-request cache of data shared between dashboard widgets"""
+
+    def __init__(self, user, now=None):
+        self.user = user
+        self.windows = TimeWindows(get_user_timezone(user), now) if now else get_time_windows(user)
+        self.now = self.windows.now
+        # The user's local date
+        self.today = self.windows.today
+        self._memo = {}
+
+    def _memoize(self, key, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def daily_totals(self):
+        """Per-day totals of completed entries since the start of the month, week or two weeks ago"""
+        def load():
+            windows = self.windows
+            since = min(windows.month_start, windows.week_start, windows.today - timedelta(days=14))
+            return get_time_buckets(self.user.id, since, windows.today, 'day', windows=windows)
+        return self._memoize('daily_totals', load)
+
+    def active_projects(self):
+        """Active projects visible to the user on the dashboard"""
+        def load():
+            if self.user.role in [Role.ADMIN, Role.SUPERVISOR]:
+                return Project.query.filter_by(
+                    company_id=self.user.company_id,
+                    is_active=True
+                ).all()
+            elif self.user.team_id:
+                return Project.query.filter(
+                    Project.company_id == self.user.company_id,
+                    Project.is_active == True,
+                    db.or_(Project.team_id == self.user.team_id, Project.team_id == None)
+                ).all()
+            return []
+        return self._memoize('active_projects', load)
+
+    def team_project_ids(self):
+        """IDs of the company projects assigned to the user's team or to no team"""
+        return self._memoize('team_project_ids', lambda: [p.id for p in Project.query.filter(
+            Project.company_id == self.user.company_id,
+            db.or_(Project.team_id == self.user.team_id, Project.team_id == None)
+        ).all()])
+
+
+class WidgetProvider:
+    """Computes and caches the data of one widget type"""
+
+    # Cache key parts for each declarable input
+    INPUTS = {
+        'user': lambda context: context.user.id,
+        'team': lambda context: context.user.team_id,
+        'company': lambda context: context.user.company_id,
+        'role': lambda context: context.user.role.value if context.user.role else None,
+        # The user's current local day, for results depending on today's date
+        'day': lambda context: context.windows.key,
+    }
+
+    def __init__(self, widget_type, compute, inputs):
+        unknown = set(inputs) - set(self.INPUTS)
+        if unknown:
+            raise ValueError(f"Unknown widget inputs: {', '.join(sorted(unknown))}")
+        self.widget_type = widget_type
+        self.compute = compute
+        self.inputs = tuple(inputs)
+
+    @staticmethod
+    def ttl(widget):
+        """Seconds a result is reused, taken from the widget's refresh interval"""
+        return max(int(widget.refresh_interval or DEFAULT_REFRESH_INTERVAL), 1)
+
+    def cache_key(self, widget, context):
+        ttl = self.ttl(widget)
+        time_bucket = int(context.now.timestamp() // ttl)
+        return (
+            self.widget_type.value,
+            tuple((name, self.INPUTS[name](context)) for name in self.inputs),
+            json.dumps(widget.config_dict, sort_keys=True),
+            ttl,
+            time_bucket,
+        )
+
+    def get_data(self, widget, context):
+        """Get the widget data from the cache or compute it"""
+        key = self.cache_key(widget, context)
+        cached = _result_cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        data = self.compute(context, widget.config_dict)
+        _store_result(key, data, self.ttl(widget),
+                      context.user.id if 'user' in self.inputs else None)
+        return data
+
+
+_providers = {}
+_result_cache = {}
+_result_cache_lock = threading.Lock()
+MAX_CACHED_RESULTS = 5000
+
+
+def widget_provider(widget_type, inputs=('user',)):
+    """Register a function computing the data of a widget type"""
+    def decorator(compute):
+        _providers[widget_type] = WidgetProvider(widget_type, compute, inputs)
+        return compute
+    return decorator
+
+
+def _store_result(key, data, ttl, user_id):
+    now = time.monotonic()
+    with _result_cache_lock:
+        if len(_result_cache) >= MAX_CACHED_RESULTS:
+            for stale_key in [k for k, v in _result_cache.items() if v[0] <= now]:
+                del _result_cache[stale_key]
+            if len(_result_cache) >= MAX_CACHED_RESULTS:
+                _result_cache.clear()
+        _result_cache[key] = (now + ttl, data, user_id)
+
+
+def invalidate_user_widgets(user_id):
+    """Drop cached results that depend on a user's own data"""
+    with _result_cache_lock:
+        for key in [k for k, v in _result_cache.items() if v[2] == user_id]:
+            del _result_cache[key]
+
+
+# Widgets listing or counting tasks, whoever's they are
+TASK_WIDGET_TYPES = (WidgetType.ASSIGNED_TASKS, WidgetType.TASK_PRIORITY, WidgetType.PROJECT_PROGRESS)
+
+
+def invalidate_task_widgets():
+    """Drop cached results of the widgets showing tasks"""
+    widget_types = {widget_type.value for widget_type in TASK_WIDGET_TYPES}
+    with _result_cache_lock:
+        for key in [k for k in _result_cache if k[0] in widget_types]:
+            del _result_cache[key]
+
+
+def build_widget_data(widget, context):
+    """Get the data for a single widget"""
+    provider = _providers.get(widget.widget_type)
+    if provider is None:
+        return {}
+    return provider.get_data(widget, context)
+
+
+@event.listens_for(TimeEntry, 'after_insert')
+@event.listens_for(TimeEntry, 'after_update')
+@event.listens_for(TimeEntry, 'after_delete')
+def _time_entry_changed(mapper, connection, target):
+    if target.user_id:
+        invalidate_user_widgets(target.user_id)
+
+
+@event.listens_for(Task, 'after_insert')
+@event.listens_for(Task, 'after_update')
+@event.listens_for(Task, 'after_delete')
+def _task_changed(mapper, connection, target):
+    # A task change can show up in teammates' and team-wide widgets, not
+    # only the assignee's, so all task widget results are dropped
+    invalidate_task_widgets()
+
+
+def _format_hours_minutes(seconds):
+    return f"{seconds // 3600}h {(seconds % 3600) // 60}m"
+
+
+@widget_provider(WidgetType.DAILY_SUMMARY, inputs=('user', 'day'))
+def daily_summary(context, config):
+    today = context.today
+    buckets = context.daily_totals()
+    today_seconds, today_count = sum_buckets(buckets, today)
+    week_seconds, week_count = sum_buckets(buckets, today - timedelta(days=today.weekday()))
+    month_seconds, month_count = sum_buckets(buckets, today.replace(day=1))
+    return {
+        'today': _format_hours_minutes(today_seconds),
+        'week': _format_hours_minutes(week_seconds),
+        'month': _format_hours_minutes(month_seconds),
+        'entries_today': today_count,
+        'entries_week': week_count,
+        'entries_month': month_count
+    }
+
+
+@widget_provider(WidgetType.ACTIVE_PROJECTS, inputs=('company', 'role', 'team'))
+def active_projects(context, config):
+    max_projects = int(config.get('max_projects', 5))
+    return {'projects': [{
+        'id': p.id,
+        'name': p.name,
+        'code': p.code,
+        'description': p.description
+    } for p in context.active_projects()[:max_projects]]}
+
+
+@widget_provider(WidgetType.ASSIGNED_TASKS)
+def assigned_tasks(context, config):
+    user = context.user
+    task_filter = config.get('task_filter', 'assigned')
+    task_status = config.get('task_status', 'active')
+
+    # Get user's tasks based on filter
+    if task_filter in ['assigned', 'created']:
+        # Created tasks fall back to assigned tasks, as before
+        tasks = Task.query.filter_by(assigned_to_id=user.id)
+    elif user.team_id:
+        tasks = Task.query.filter(Task.project_id.in_(context.team_project_ids()))
+    else:
+        tasks = Task.query.join(Project).filter(Project.company_id == user.company_id)
+
+    # Filter by status if specified
+    if task_status == 'active':
+        tasks = tasks.filter(Task.status.in_([TaskStatus.TODO, TaskStatus.IN_PROGRESS]))
+    elif task_status == 'pending':
+        tasks = tasks.filter_by(status=TaskStatus.TODO)
+    elif task_status == 'completed':
+        tasks = tasks.filter_by(status=TaskStatus.DONE)
+
+    return {'tasks': [{
+        'id': t.id,
+        'name': t.name,
+        'description': t.description,
+        'status': t.status.value if t.status else 'Pending',
+        'priority': t.priority.value if t.priority else 'Medium',
+        'project_name': t.project.name if t.project else 'No Project'
+    } for t in tasks.limit(10).all()]}
+
+
+@widget_provider(WidgetType.WEEKLY_CHART, inputs=('user', 'day'))
+def weekly_chart(context, config):
+    today = context.today
+    start_of_week = today - timedelta(days=today.weekday())
+    buckets = context.daily_totals()
+
+    weekly_data = []
+    for i in range(7):
+        day = start_of_week + timedelta(days=i)
+        totals = buckets.get(day, {'seconds': 0, 'count': 0})
+        weekly_data.append({
+            'day': day.strftime('%A'),
+            'date': day.strftime('%Y-%m-%d'),
+            'hours': round(totals['seconds'] / 3600, 2),
+            'entries': totals['count']
+        })
+
+    return {'weekly_data': weekly_data}
+
+
+@widget_provider(WidgetType.TASK_PRIORITY)
+def task_priority(context, config):
+    user = context.user
+    if user.team_id:
+        tasks = Task.query.filter(
+            Task.project_id.in_(context.team_project_ids()),
+            Task.assigned_to_id == user.id
+        )
+    else:
+        tasks = Task.query.filter_by(assigned_to_id=user.id)
+    tasks = tasks.order_by(Task.priority.desc(), Task.created_at.desc()).limit(10).all()
+
+    return {'priority_tasks': [{
+        'id': t.id,
+        'name': t.name,
+        'description': t.description,
+        'priority': t.priority.value if t.priority else 'Medium',
+        'status': t.status.value if t.status else 'Pending',
+        'project_name': t.project.name if t.project else 'No Project'
+    } for t in tasks]}
+
+
+@widget_provider(WidgetType.PROJECT_PROGRESS, inputs=('company', 'role', 'team'))
+def project_progress(context, config):
+    projects = context.active_projects()[:5]
+    totals = get_project_progress([project.id for project in projects])
+
+    return {'project_progress': [{
+        'id': project.id,
+        'name': project.name,
+        'code': project.code,
+        'progress': totals[project.id]['progress'],
+        'completed_tasks': totals[project.id]['completed_tasks'],
+        'total_tasks': totals[project.id]['total_tasks']
+    } for project in projects]}
+
+
+@widget_provider(WidgetType.PRODUCTIVITY_STATS, inputs=('user', 'day'))
+def productivity_stats(context, config):
+    # This week vs last week comparison
+    week_ago = context.today - timedelta(days=7)
+    buckets = context.daily_totals()
+    this_week_seconds, this_week_count = sum_buckets(buckets, week_ago)
+    last_week_seconds, _ = sum_buckets(buckets, week_ago - timedelta(days=7), week_ago - timedelta(days=1))
+
+    this_week_hours = this_week_seconds / 3600
+    last_week_hours = last_week_seconds / 3600
+
+    productivity_change = ((this_week_hours - last_week_hours) / last_week_hours * 100) if last_week_hours > 0 else 0
+
+    return {
+        'this_week_hours': round(this_week_hours, 1),
+        'last_week_hours': round(last_week_hours, 1),
+        'productivity_change': round(productivity_change, 1),
+        'avg_daily_hours': round(this_week_hours / 7, 1),
+        'total_entries': this_week_count
+    }
+